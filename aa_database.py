@@ -8,171 +8,848 @@ import sqlite3
 import json
 import datetime
 import logging
-from typing import Optional, List, Dict, Any, Tuple
+import queue
+import re
+import threading
+import time
+from typing import Optional, List, Dict, Any, Tuple, Iterable, Iterator
 from pathlib import Path
 from contextlib import contextmanager
+from functools import lru_cache
+from itertools import chain, groupby
+from operator import itemgetter
+
+# orjson is optional; fall back to the stdlib json module if it is not installed
+try:
+    import orjson
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj) -> str:
+        return json.dumps(obj, separators=(',', ':'))
+
+    _json_loads = json.loads
 
 logger = logging.getLogger('aa_report_automation')
 
+_now = datetime.datetime.now
+
+
+def _now_iso() -> str:
+    """Current local time as ISO-8601 text, the format stored in every *_at/timestamp column.
+
+    Second precision keeps the values 7 bytes shorter than the default isoformat()
+    while still sorting correctly against older microsecond-precision rows.
+    """
+    return _now().isoformat(timespec='seconds')
+
+
+def _bool_or_null(value) -> Optional[int]:
+    """Tri-state flag for INTEGER columns: None stays NULL, anything else becomes 0/1."""
+    return None if value is None else int(bool(value))
+
+
+# Instance type naming per provider, tried in this order:
+# AWS m5.large / r6i.xlarge, GCP n1-standard-4 / c3-highcpu-4, Azure Standard_D4s_v3
+_PROVIDER_INSTANCE_RE = re.compile(
+    r'(?P<AWS>[mrctixzpgd].*\.)'
+    r'|(?P<GCP>(?:n1|n2|c2|c3|e2|m1|m2).*-)'
+    r'|(?P<Azure>Standard_)',
+    re.DOTALL,
+)
+
+# Distinct instance type lists whose detected cloud provider is remembered
+PROVIDER_CACHE_SIZE = 4096
+
+
+def detect_cloud_provider(instance_types) -> str:
+    """Cloud provider ('AWS', 'GCP', 'Azure' or 'Unknown') from instance type names.
+
+    Used at ingest to fill cluster_singles.instance_provider, the fallback for
+    clusters whose metadata has no cloud_provider.
+    """
+    if not instance_types:
+        return 'Unknown'
+    # Clusters share a handful of instance type mixes; memoize on the ordered tuple
+    return _detect_cloud_provider(tuple(instance_types))
+
+
+@lru_cache(maxsize=PROVIDER_CACHE_SIZE)
+def _detect_cloud_provider(instance_types: Tuple[str, ...]) -> str:
+    # The first instance type that looks like any provider's decides
+    for instance_type in instance_types:
+        match = _PROVIDER_INSTANCE_RE.match(instance_type)
+        if match:
+            return match.lastgroup
+    return 'Unknown'
+
+
+# Per-connection prepared statement cache (sqlite3 default is 128)
+STATEMENT_CACHE_SIZE = 256
+
+# Entries kept per memoized read (get_cluster_history / get_top_savings_opportunities)
+QUERY_CACHE_SIZE = 1024
+
+# fetchmany() batch size for streamed reads
+READ_BATCH_ROWS = 1000
+
+# BEGIN IMMEDIATE waits longer than this (seconds) are logged as lock contention
+SLOW_LOCK_WAIT = 1.0
+
+# Saved clusters between periodic PRAGMA optimize calls during a run
+OPTIMIZE_EVERY = 500
+
+# BackgroundWriter: max queued writes per commit, and how long (seconds) to
+# wait for more writes before committing a partial batch
+WRITER_BATCH_SIZE = 50
+WRITER_FLUSH_INTERVAL = 0.5
+
+# Accepted values for AADatabase(synchronous=...)
+SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+# Applied to every connection as one script. busy_timeout is SQLite's native
+# busy handler (replaces sqlite3.connect(timeout=...)); cache_size is negative
+# KiB, i.e. 64 MiB per connection; analysis_limit bounds ANALYZE / PRAGMA optimize
+# to a sample of rows per index. synchronous is appended per instance.
+CONNECTION_PRAGMAS = '''
+PRAGMA busy_timeout=30000;
+PRAGMA cache_size=-65536;
+PRAGMA temp_store=MEMORY;
+PRAGMA mmap_size=268435456;
+PRAGMA foreign_keys=ON;
+PRAGMA journal_mode=WAL;
+PRAGMA analysis_limit=1000;
+'''
+
+# Hot-path SQL, kept as module constants so every call reuses the same text
+# and hits the connection's prepared statement cache.
+SQL_SELECT_PROCESSED = "SELECT mc_uid FROM cluster_results WHERE run_id = ? AND status = 'success'"
+
+# Upserts keep the existing result_id on re-processing (INSERT OR REPLACE would
+# delete the row and break the cluster_singles foreign key)
+SQL_INSERT_RESULT = '''
+    INSERT INTO cluster_results
+    (run_id, mc_uid, processed_at, status, total_savings, savings_percent,
+     total_current, total_optimal)
+    VALUES (?, ?, ?, 'success', ?, ?, ?, ?)
+    ON CONFLICT(run_id, mc_uid) DO UPDATE SET
+        processed_at = excluded.processed_at, status = excluded.status, error_message = NULL,
+        total_savings = excluded.total_savings, savings_percent = excluded.savings_percent,
+        total_current = excluded.total_current, total_optimal = excluded.total_optimal
+    RETURNING result_id
+'''
+
+# Singles of a result that is being re-saved or marked failed
+SQL_DELETE_SINGLES_INFRA = '''
+    DELETE FROM cluster_singles_infra
+    WHERE single_id IN (SELECT single_id FROM cluster_singles WHERE result_id = ?)
+'''
+
+SQL_DELETE_SINGLES = 'DELETE FROM cluster_singles WHERE result_id = ?'
+
+# total_instances is summed from the bound infra_json (?4) inside SQLite
+SQL_INSERT_SINGLE = '''
+    INSERT INTO cluster_singles
+    (result_id, cluster_uid, cluster_type, infra_json,
+     instance_price, storage_price, total_price, instance_provider, total_instances)
+    VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8,
+            (SELECT COALESCE(SUM(value), 0) FROM json_each(?4)))
+'''
+
+SQL_INSERT_SINGLES_INFRA = '''
+    INSERT INTO cluster_singles_infra (single_id, instance_type, instance_count, position)
+    SELECT cs.single_id, j.key, j.value, j.id
+    FROM cluster_singles cs, json_each(cs.infra_json) j
+    WHERE cs.result_id = ?
+'''
+
+SQL_MARK_FAILED = '''
+    INSERT INTO cluster_results
+    (run_id, mc_uid, processed_at, status, error_message)
+    VALUES (?, ?, ?, 'failed', ?)
+    ON CONFLICT(run_id, mc_uid) DO UPDATE SET
+        processed_at = excluded.processed_at, status = excluded.status,
+        error_message = excluded.error_message, total_savings = NULL, savings_percent = NULL,
+        total_current = NULL, total_optimal = NULL
+    RETURNING result_id
+'''
+
+SQL_RUN_COUNTS = '''
+    SELECT COUNT(*) FILTER (WHERE status = 'success') AS processed,
+           COUNT(*) FILTER (WHERE status = 'failed') AS failed
+    FROM cluster_results WHERE run_id = ?
+'''
+
+# Run totals cover successful clusters with positive savings (what the savings trend reports)
+SQL_RUN_TOTALS = '''
+    SELECT SUM(total_current), SUM(total_optimal), SUM(total_savings)
+    FROM cluster_results
+    WHERE run_id = runs.run_id AND status = 'success' AND total_savings > 0
+'''
+
+SQL_COMPLETE_RUN = f'''
+    UPDATE runs SET
+        (processed_clusters, failed_clusters) = (
+            SELECT COUNT(*) FILTER (WHERE status = 'success'), COUNT(*) FILTER (WHERE status = 'failed')
+            FROM cluster_results WHERE run_id = runs.run_id),
+        (total_current, total_optimal, total_savings) = ({SQL_RUN_TOTALS}),
+        status = 'completed', completed_at = ?, csv_path = ?
+    WHERE run_id = ?
+'''
+
+SQL_SELECT_RESULT_ID = 'SELECT result_id FROM cluster_results WHERE run_id = ? AND mc_uid = ? AND status = ?'
+
+SQL_SELECT_SINGLES = '''
+    SELECT result_id, cluster_uid, cluster_type, infra_json, instance_price, storage_price, total_price
+    FROM cluster_singles WHERE result_id = ? ORDER BY single_id
+'''
+
+SQL_SELECT_RUN_RESULTS = '''
+    SELECT cr.mc_uid, cs.cluster_uid, cs.cluster_type, cs.infra_json,
+           cs.instance_price, cs.storage_price, cs.total_price
+    FROM cluster_results cr
+    JOIN cluster_singles cs ON cr.result_id = cs.result_id
+    WHERE cr.run_id = ? AND cr.status = 'success'
+    ORDER BY cr.processed_at, cr.result_id, cs.single_id
+'''
+
+SQL_SELECT_HISTORY = '''
+    SELECT r.run_timestamp AS timestamp, r.jira_ticket,
+           cr.total_savings AS savings, cr.savings_percent,
+           cr.total_current AS current_price, cr.total_optimal AS optimal_price
+    FROM cluster_results cr
+    JOIN runs r ON cr.run_id = r.run_id
+    WHERE cr.mc_uid = ? AND cr.status = 'success'
+    ORDER BY r.run_timestamp DESC, r.run_id DESC LIMIT ?
+'''
+
+# Dashboard savings trend and recent runs history in one round trip; the kind
+# column tells the two slices apart (both newest first)
+SQL_SELECT_RUNS_OVERVIEW = '''
+    SELECT * FROM (
+        SELECT 'trend' AS kind, run_id, run_timestamp, jira_ticket,
+               NULL AS total_clusters, NULL AS processed_clusters, NULL AS failed_clusters,
+               status, completed_at, total_savings, total_current, total_optimal
+        FROM runs
+        WHERE status = 'completed' AND total_savings IS NOT NULL
+        ORDER BY run_timestamp DESC, run_id DESC LIMIT ?
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT 'history', run_id, run_timestamp, jira_ticket,
+               total_clusters, processed_clusters, failed_clusters,
+               status, completed_at, NULL, NULL, NULL
+        FROM runs
+        ORDER BY run_timestamp DESC LIMIT ?
+    )
+    ORDER BY kind DESC, run_timestamp DESC, run_id DESC
+'''
+
+RUN_HISTORY_FIELDS = ('run_id', 'run_timestamp', 'jira_ticket', 'total_clusters',
+                      'processed_clusters', 'failed_clusters', 'status', 'completed_at')
+
+SQL_SELECT_OPTIMAL_PLAN = 'SELECT plan_json FROM optimal_plan_cache WHERE mc_uid = ? AND cached_at >= ?'
+
+SQL_UPSERT_OPTIMAL_PLAN = '''
+    INSERT INTO optimal_plan_cache (mc_uid, plan_json, cached_at) VALUES (?, ?, ?)
+    ON CONFLICT(mc_uid) DO UPDATE SET plan_json = excluded.plan_json, cached_at = excluded.cached_at
+'''
+
+# Dashboard aggregates for a run, stored in run_summary by complete_run (all but
+# cluster ages, which depend on the current date)
+RUN_SUMMARY_FIELDS = (
+    'total_savings', 'total_current', 'total_optimal', 'avg_savings', 'median_savings',
+    'optimizable_clusters', 'high_impact_clusters', 'storage_savings', 'attention_count',
+    'most_used_instance', 'most_used_instance_count', 'most_used_instance_avg_cost',
+    'top_provider', 'top_provider_count', 'top_provider_cost',
+    'second_provider', 'second_provider_count', 'second_provider_cost', 'provider_cluster_count',
+)
+
+# Percentages that are pure functions of the stored totals; added to run_summary as
+# VIRTUAL generated columns (see _create_schema), so SQLite derives them on read
+_EFFICIENCY_PERCENT = 'CASE WHEN total_current > 0 THEN COALESCE(total_optimal, 0) / total_current * 100 ELSE 100 END'
+RUN_SUMMARY_DERIVED = {
+    'savings_percent_of_spend':
+        'CASE WHEN total_current > 0 THEN COALESCE(total_savings, 0) / total_current * 100 ELSE 0 END',
+    'efficiency_percent': _EFFICIENCY_PERCENT,
+    'over_provisioned_percent': f'100 - ({_EFFICIENCY_PERCENT})',
+    'storage_savings_percent':
+        'CASE WHEN total_savings > 0 THEN COALESCE(storage_savings, 0) / total_savings * 100 ELSE 0 END',
+}
+
+SQL_SELECT_RUN_SUMMARY = (f"SELECT {', '.join(RUN_SUMMARY_FIELDS + tuple(RUN_SUMMARY_DERIVED))} "
+                          "FROM run_summary WHERE run_id = ?")
+
+# The same derived values for a summary that is not stored (run still in progress)
+SQL_RUN_SUMMARY_DERIVED = f'''
+    SELECT {', '.join(f'{expr} AS {name}' for name, expr in RUN_SUMMARY_DERIVED.items())}
+    FROM (SELECT ? AS total_savings, ? AS total_current, ? AS total_optimal, ? AS storage_savings)
+'''
+
+SQL_SAVE_RUN_SUMMARY = f'''
+    INSERT OR REPLACE INTO run_summary (run_id, {', '.join(RUN_SUMMARY_FIELDS)})
+    VALUES (?{', ?' * len(RUN_SUMMARY_FIELDS)})
+'''
+
+# Positive-savings results and their singles, materialized once per query
+SQL_SUMMARY_METRICS = '''
+    WITH pr AS MATERIALIZED (
+        SELECT result_id, mc_uid, total_savings
+        FROM cluster_results
+        WHERE run_id = ? AND status = 'success' AND total_savings > 0
+    ),
+    pr_singles AS MATERIALIZED (
+        SELECT pr.mc_uid, pr.total_savings, cs.cluster_type, cs.total_price, cs.storage_price
+        FROM pr
+        JOIN cluster_singles cs ON pr.result_id = cs.result_id
+    )
+    SELECT
+        (SELECT SUM(total_savings) FROM pr) AS total_savings,
+        SUM(CASE WHEN cluster_type = 'current' THEN total_price ELSE 0 END) AS total_current,
+        SUM(CASE WHEN cluster_type = 'optimal' THEN total_price ELSE 0 END) AS total_optimal,
+        (SELECT AVG(total_savings) FROM pr) AS avg_savings,
+        COUNT(DISTINCT mc_uid) AS optimizable_clusters,
+        COUNT(DISTINCT CASE WHEN total_savings > 2000 THEN mc_uid END) AS high_impact_clusters,
+        SUM(CASE WHEN cluster_type = 'current' THEN storage_price ELSE 0 END) -
+        SUM(CASE WHEN cluster_type = 'optimal' THEN storage_price ELSE 0 END) AS storage_savings
+    FROM pr_singles
+'''
+
+# Upper median of positive savings, from a single ordered pass
+SQL_SUMMARY_MEDIAN = '''
+    WITH ranked AS (
+        SELECT total_savings,
+               ROW_NUMBER() OVER (ORDER BY total_savings) AS rn,
+               COUNT(*) OVER () AS cnt
+        FROM cluster_results
+        WHERE run_id = ? AND status = 'success' AND total_savings > 0
+    )
+    SELECT total_savings FROM ranked WHERE rn = cnt / 2 + 1
+'''
+
+# Most used instance type across current configurations, and how many use it
+SQL_SUMMARY_MOST_USED_INSTANCE = '''
+    SELECT csi.instance_type, SUM(csi.instance_count) AS instances, COUNT(*) AS clusters
+    FROM cluster_results cr
+    JOIN cluster_singles cs ON cr.result_id = cs.result_id
+    JOIN cluster_singles_infra csi ON csi.single_id = cs.single_id
+    WHERE cr.run_id = ? AND cr.status = 'success' AND cs.cluster_type = 'current'
+    GROUP BY csi.instance_type
+    ORDER BY instances DESC, csi.instance_type
+    LIMIT 1
+'''
+
+# Average current cost of the configurations that use a given instance type
+SQL_SUMMARY_INSTANCE_AVG_COST = '''
+    SELECT AVG(cs.total_price)
+    FROM cluster_results cr
+    JOIN cluster_singles cs ON cr.result_id = cs.result_id
+    WHERE cr.run_id = ? AND cs.cluster_type = 'current'
+    AND EXISTS (SELECT 1 FROM cluster_singles_infra csi
+                WHERE csi.single_id = cs.single_id AND csi.instance_type = ?)
+'''
+
+# Per-provider counts and cost, plus clusters needing attention (>$1K savings OR
+# >30% cost reduction) from the same join. Providers partition the clusters, so
+# the run-wide totals are window sums over the groups, repeated on every row
+SQL_SUMMARY_PROVIDERS = '''
+    WITH per_provider AS (
+        SELECT
+            cm.cloud_provider,
+            COUNT(DISTINCT cr.mc_uid) AS cluster_count,
+            SUM(CASE WHEN cs.cluster_type = 'current' THEN cs.total_price ELSE 0 END) AS total_cost,
+            COUNT(DISTINCT CASE
+                WHEN cr.total_savings > 1000
+                  OR (cs.cluster_type = 'current' AND cs.total_price > 0
+                      AND (cr.total_savings / cs.total_price * 100) > 30)
+                THEN cr.mc_uid END) AS attention_count
+        FROM cluster_results cr
+        JOIN cluster_singles cs ON cr.result_id = cs.result_id
+        LEFT JOIN cluster_metadata cm ON cr.mc_uid = cm.mc_uid
+        WHERE cr.run_id = ? AND cr.status = 'success'
+        GROUP BY cm.cloud_provider
+    )
+    SELECT *,
+           SUM(attention_count) OVER () AS run_attention_count,
+           SUM(CASE WHEN cloud_provider <> '' THEN cluster_count ELSE 0 END) OVER () AS provider_cluster_count
+    FROM per_provider
+    ORDER BY cluster_count DESC
+'''
+
+# Full schema, applied as one script/transaction every time the database is opened
+SCHEMA_DDL = '''
+BEGIN;
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_timestamp TEXT NOT NULL,
+    jira_ticket TEXT,
+    total_clusters INTEGER DEFAULT 0,
+    processed_clusters INTEGER DEFAULT 0,
+    failed_clusters INTEGER DEFAULT 0,
+    status TEXT DEFAULT 'in_progress',
+    csv_path TEXT,
+    completed_at TEXT,
+    notes TEXT,
+    -- Filled by complete_run
+    total_current REAL,
+    total_optimal REAL,
+    total_savings REAL
+);
+
+CREATE TABLE IF NOT EXISTS cluster_results (
+    result_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL,
+    mc_uid TEXT NOT NULL,
+    processed_at TEXT NOT NULL,
+    status TEXT DEFAULT 'success',
+    error_message TEXT,
+    total_savings REAL,
+    savings_percent REAL,
+    total_current REAL,
+    total_optimal REAL,
+    FOREIGN KEY (run_id) REFERENCES runs(run_id),
+    UNIQUE(run_id, mc_uid)
+);
+
+CREATE TABLE IF NOT EXISTS cluster_singles (
+    single_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    result_id INTEGER NOT NULL,
+    cluster_uid TEXT NOT NULL,
+    cluster_type TEXT NOT NULL,
+    infra_json TEXT NOT NULL,
+    instance_price REAL NOT NULL,
+    storage_price REAL NOT NULL,
+    total_price REAL NOT NULL,
+    total_instances INTEGER,
+    instance_provider TEXT,
+    FOREIGN KEY (result_id) REFERENCES cluster_results(result_id)
+);
+
+-- infra_json normalized to one row per instance type, for SQL-side aggregation;
+-- position keeps the key order of infra_json (json_each id)
+CREATE TABLE IF NOT EXISTS cluster_singles_infra (
+    single_id INTEGER NOT NULL,
+    instance_type TEXT NOT NULL,
+    instance_count INTEGER NOT NULL,
+    position INTEGER,
+    PRIMARY KEY (single_id, instance_type),
+    FOREIGN KEY (single_id) REFERENCES cluster_singles(single_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS cluster_metadata (
+    mc_uid TEXT PRIMARY KEY,
+    cluster_name TEXT,
+    cloud_provider TEXT,
+    region TEXT,
+    account_id TEXT,
+    redis_version TEXT,
+    multi_az INTEGER,
+    availability_zones TEXT,
+    storage_type TEXT,
+    -- New fields
+    creation_date TEXT,
+    shards_count INTEGER,
+    max_shards_count INTEGER,
+    total_storage_gb INTEGER,
+    data_nodes_count INTEGER,
+    quorum_nodes_count INTEGER,
+    total_nodes_count INTEGER,
+    os_version TEXT,
+    software_version TEXT,
+    rof_enabled INTEGER,
+    -- Timestamps
+    created_at TEXT,
+    last_updated TEXT
+);
+
+-- Raw plan_optimal_multi_cluster responses, reused by re-runs within a TTL
+CREATE TABLE IF NOT EXISTS optimal_plan_cache (
+    mc_uid TEXT PRIMARY KEY,
+    plan_json TEXT NOT NULL,
+    cached_at TEXT NOT NULL
+);
+
+-- Pre-aggregated dashboard metrics per completed run (see RUN_SUMMARY_FIELDS)
+CREATE TABLE IF NOT EXISTS run_summary (
+    run_id INTEGER PRIMARY KEY,
+    total_savings REAL,
+    total_current REAL,
+    total_optimal REAL,
+    avg_savings REAL,
+    median_savings REAL,
+    optimizable_clusters INTEGER,
+    high_impact_clusters INTEGER,
+    storage_savings REAL,
+    attention_count INTEGER,
+    most_used_instance TEXT,
+    most_used_instance_count INTEGER,
+    most_used_instance_avg_cost REAL,
+    top_provider TEXT,
+    top_provider_count INTEGER,
+    top_provider_cost REAL,
+    second_provider TEXT,
+    second_provider_count INTEGER,
+    second_provider_cost REAL,
+    provider_cluster_count INTEGER,
+    FOREIGN KEY (run_id) REFERENCES runs(run_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_runs_timestamp ON runs(run_timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_cluster_results_mc_uid ON cluster_results(mc_uid);
+CREATE INDEX IF NOT EXISTS idx_cluster_results_run_id ON cluster_results(run_id);
+CREATE INDEX IF NOT EXISTS idx_cluster_results_savings ON cluster_results(total_savings DESC);
+CREATE INDEX IF NOT EXISTS idx_cluster_metadata_provider ON cluster_metadata(cloud_provider);
+CREATE INDEX IF NOT EXISTS idx_cluster_metadata_region ON cluster_metadata(region);
+DROP INDEX IF EXISTS idx_cluster_results_run_status;
+CREATE INDEX IF NOT EXISTS idx_cluster_results_run_status_savings ON cluster_results(run_id, status, total_savings, mc_uid);
+DROP INDEX IF EXISTS idx_cluster_singles_result_type;
+CREATE INDEX IF NOT EXISTS idx_cluster_singles_result_covering ON cluster_singles(result_id, cluster_type, total_price, instance_price, storage_price, instance_provider);
+CREATE INDEX IF NOT EXISTS idx_cluster_results_success_savings ON cluster_results(run_id, total_savings DESC, mc_uid, savings_percent, total_current, total_optimal, status) WHERE status = 'success';
+CREATE INDEX IF NOT EXISTS idx_cluster_singles_infra_type ON cluster_singles_infra(instance_type);
+-- Chart joins read only these metadata columns; covering them skips the table lookup per cluster
+CREATE INDEX IF NOT EXISTS idx_cluster_metadata_chart_covering ON cluster_metadata(mc_uid, cloud_provider, software_version, redis_version, creation_date, created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_status_timestamp ON runs(status, run_timestamp DESC);
+COMMIT;
+'''
+
+# cluster_singles_infra was added after the first release; fill it from existing singles
+SCHEMA_BACKFILL_INFRA = '''
+BEGIN;
+INSERT INTO cluster_singles_infra (single_id, instance_type, instance_count, position)
+SELECT cs.single_id, j.key, j.value, j.id
+FROM cluster_singles cs, json_each(cs.infra_json) j;
+COMMIT;
+'''
+
+# Per-result price totals were added to cluster_results after the first release;
+# older databases get the columns added and backfilled from cluster_singles.
+SCHEMA_MIGRATE_TOTALS = '''
+BEGIN;
+ALTER TABLE cluster_results ADD COLUMN total_current REAL;
+ALTER TABLE cluster_results ADD COLUMN total_optimal REAL;
+UPDATE cluster_results SET
+    total_current = (SELECT COALESCE(SUM(cs.total_price), 0) FROM cluster_singles cs
+                     WHERE cs.result_id = cluster_results.result_id AND cs.cluster_type = 'current'),
+    total_optimal = (SELECT COALESCE(SUM(cs.total_price), 0) FROM cluster_singles cs
+                     WHERE cs.result_id = cluster_results.result_id AND cs.cluster_type = 'optimal')
+WHERE status = 'success';
+COMMIT;
+'''
+
+
+# Run-level totals were added to runs later; backfill them for completed runs
+SCHEMA_MIGRATE_RUN_TOTALS = f'''
+BEGIN;
+ALTER TABLE runs ADD COLUMN total_current REAL;
+ALTER TABLE runs ADD COLUMN total_optimal REAL;
+ALTER TABLE runs ADD COLUMN total_savings REAL;
+UPDATE runs SET (total_current, total_optimal, total_savings) = ({SQL_RUN_TOTALS})
+WHERE status = 'completed';
+COMMIT;
+'''
+
+
+def _single(row: tuple) -> Dict:
+    _, uid, _, infra_json, instance_price, storage_price, total_price = row
+    return {
+        'uid': uid,
+        'infra': _json_loads(infra_json),
+        'price': {'instance': instance_price, 'storage': storage_price, 'total': total_price}
+    }
+
+
+def _trend_entry(row: sqlite3.Row) -> Dict:
+    tc, to, ts = row['total_current'] or 0, row['total_optimal'] or 0, row['total_savings'] or 0
+    return {
+        'timestamp': row['run_timestamp'],
+        'jira_ticket': row['jira_ticket'],
+        'total_current': round(tc, 2),
+        'total_optimal': round(to, 2),
+        'total_savings': round(ts, 2),
+        'savings_percent': round((tc - to) / tc * 100, 2) if tc > 0 else 0
+    }
+
+
+def _pair_singles(rows: Iterable[tuple]) -> List[Tuple[Dict, Dict]]:
+    """Group singles rows into (current, optimal) pairs, in insertion order.
+
+    Rows are plain tuples (no sqlite3.Row) laid out as
+    (key, cluster_uid, cluster_type, infra_json, instance_price, storage_price, total_price)
+    and ordered by single_id; save_cluster_result writes each pair's two rows
+    back to back, so a pair is a contiguous run of one cluster_uid.
+    """
+    pairs = []
+    for _, group in groupby(rows, key=itemgetter(1)):
+        current = optimal = None
+        for row in group:
+            if row[2] == 'current':
+                current = row
+            else:
+                optimal = row
+        if current is not None and optimal is not None:
+            pairs.append((_single(current), _single(optimal)))
+    return pairs
+
 
 class AADatabase:
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, synchronous: str = 'NORMAL'):
         if db_path is None:
             db_path = str(Path.home() / 'aa_report_cache.db')
+        synchronous = synchronous.upper()
+        if synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(f"synchronous must be one of {', '.join(SYNCHRONOUS_MODES)}")
         self.db_path = db_path
-        self.conn = None
-        self._connect()
+        self.synchronous = synchronous
+        self._local = threading.local()
+        self._connections: Dict[threading.Thread, sqlite3.Connection] = {}
+        self._connections_lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._saves_since_optimize = 0
+        self._in_batch = False
+        # Memoized reads, keyed on _read_cache_state() so rows read before a commit
+        # by any connection (e.g. the automation process) are not served after it
+        self._read_cache_lock = threading.Lock()
+        self._watch_conn: Optional[sqlite3.Connection] = None
+        self._last_read_cache_state = None
+        self._history_cache = lru_cache(maxsize=QUERY_CACHE_SIZE)(self._get_cluster_history_impl)
+        self._top_savings_cache = lru_cache(maxsize=QUERY_CACHE_SIZE)(self._get_top_savings_impl)
         self._create_schema()
         logger.info(f"Database: {self.db_path}")
 
-    def _connect(self):
-        self.conn = sqlite3.connect(self.db_path, timeout=30.0)
-        self.conn.row_factory = sqlite3.Row
-        self.conn.execute("PRAGMA foreign_keys = ON")
-        self.conn.execute("PRAGMA journal_mode=WAL")
-    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._get_conn()
+        return conn
+
+    @property
+    def _cur(self) -> sqlite3.Cursor:
+        # Long-lived cursor for the hot write paths; only used under self._write_lock
+        if getattr(self._local, 'conn', None) is None:
+            self._get_conn()
+        return self._local.cur
+
+    def _get_conn(self) -> sqlite3.Connection:
+        # One WAL connection per thread: reads run concurrently across threads,
+        # writes are serialized by self._write_lock. check_same_thread is off only
+        # so close() can close every thread's connection.
+        conn = sqlite3.connect(self.db_path, cached_statements=STATEMENT_CACHE_SIZE,
+                               check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        # NORMAL is durable across application crashes under WAL; pass synchronous='FULL'
+        # to also survive power loss at the cost of an fsync per commit
+        conn.executescript(f"{CONNECTION_PRAGMAS}PRAGMA synchronous={self.synchronous};")
+        self._local.conn = conn
+        self._local.cur = conn.cursor()
+        with self._connections_lock:
+            # A long-lived instance (e.g. shared by web request threads) outlives
+            # threads; close connections whose thread has exited
+            for thread in [t for t in self._connections if not t.is_alive()]:
+                self._connections.pop(thread).close()
+            self._connections[threading.current_thread()] = conn
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """Connection for read-only queries (this thread's connection)."""
+        yield self.conn
+
     def _create_schema(self):
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS runs (
-                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                run_timestamp TEXT NOT NULL,
-                jira_ticket TEXT,
-                total_clusters INTEGER DEFAULT 0,
-                processed_clusters INTEGER DEFAULT 0,
-                failed_clusters INTEGER DEFAULT 0,
-                status TEXT DEFAULT 'in_progress',
-                csv_path TEXT,
-                completed_at TEXT,
-                notes TEXT
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS cluster_results (
-                result_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                run_id INTEGER NOT NULL,
-                mc_uid TEXT NOT NULL,
-                processed_at TEXT NOT NULL,
-                status TEXT DEFAULT 'success',
-                error_message TEXT,
-                total_savings REAL,
-                savings_percent REAL,
-                FOREIGN KEY (run_id) REFERENCES runs(run_id),
-                UNIQUE(run_id, mc_uid)
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS cluster_singles (
-                single_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                result_id INTEGER NOT NULL,
-                cluster_uid TEXT NOT NULL,
-                cluster_type TEXT NOT NULL,
-                infra_json TEXT NOT NULL,
-                instance_price REAL NOT NULL,
-                storage_price REAL NOT NULL,
-                total_price REAL NOT NULL,
-                total_instances INTEGER,
-                FOREIGN KEY (result_id) REFERENCES cluster_results(result_id)
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS cluster_metadata (
-                mc_uid TEXT PRIMARY KEY,
-                cluster_name TEXT,
-                cloud_provider TEXT,
-                region TEXT,
-                account_id TEXT,
-                redis_version TEXT,
-                multi_az INTEGER,
-                availability_zones TEXT,
-                storage_type TEXT,
-                -- New fields
-                creation_date TEXT,
-                shards_count INTEGER,
-                max_shards_count INTEGER,
-                total_storage_gb INTEGER,
-                data_nodes_count INTEGER,
-                quorum_nodes_count INTEGER,
-                total_nodes_count INTEGER,
-                os_version TEXT,
-                software_version TEXT,
-                rof_enabled INTEGER,
-                -- Timestamps
-                created_at TEXT,
-                last_updated TEXT
-            )
-        ''')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_runs_timestamp ON runs(run_timestamp DESC)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_cluster_results_mc_uid ON cluster_results(mc_uid)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_cluster_results_run_id ON cluster_results(run_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_cluster_results_savings ON cluster_results(total_savings DESC)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_cluster_metadata_provider ON cluster_metadata(cloud_provider)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_cluster_metadata_region ON cluster_metadata(region)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_cluster_results_run_status ON cluster_results(run_id, status)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_cluster_singles_result_type ON cluster_singles(result_id, cluster_type)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_runs_status_timestamp ON runs(status, run_timestamp DESC)')
-        self.conn.commit()
+        # Migrate existing databases first: SCHEMA_DDL indexes the newer columns
+        columns = {row['name'] for row in self.conn.execute('PRAGMA table_info(cluster_results)')}
+        if columns and 'total_current' not in columns:
+            logger.info("Migrating cluster_results: adding total_current/total_optimal")
+            self.conn.executescript(SCHEMA_MIGRATE_TOTALS)
+        single_columns = {row['name'] for row in self.conn.execute('PRAGMA table_info(cluster_singles)')}
+        if single_columns and 'instance_provider' not in single_columns:
+            logger.info("Migrating cluster_singles: adding instance_provider")
+            with self.transaction():
+                self.conn.execute('ALTER TABLE cluster_singles ADD COLUMN instance_provider TEXT')
+                self.conn.executemany(
+                    'UPDATE cluster_singles SET instance_provider = ? WHERE single_id = ?',
+                    [(detect_cloud_provider(_json_loads(infra_json)), single_id) for single_id, infra_json
+                     in self.conn.execute('SELECT single_id, infra_json FROM cluster_singles').fetchall()])
+        run_columns = {row['name'] for row in self.conn.execute('PRAGMA table_info(runs)')}
+        if run_columns and 'total_current' not in run_columns:
+            logger.info("Migrating runs: adding total_current/total_optimal/total_savings")
+            self.conn.executescript(SCHEMA_MIGRATE_RUN_TOTALS)
+        new_covering_index = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_cluster_singles_result_covering'"
+        ).fetchone() is None
+        new_metadata_index = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_cluster_metadata_chart_covering'"
+        ).fetchone() is None
+        new_results_index = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_cluster_results_run_status_savings'"
+        ).fetchone() is None
+        new_infra_table = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cluster_singles_infra'"
+        ).fetchone() is None
+        new_summary_table = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'run_summary'"
+        ).fetchone() is None
+        self.conn.executescript(SCHEMA_DDL)
+        # table_xinfo: table_info leaves out generated columns
+        summary_columns = {row['name'] for row in self.conn.execute('PRAGMA table_xinfo(run_summary)')}
+        for name, expr in RUN_SUMMARY_DERIVED.items():
+            if name not in summary_columns:
+                self.conn.execute(f'ALTER TABLE run_summary ADD COLUMN {name} REAL GENERATED ALWAYS AS ({expr}) VIRTUAL')
+        if new_infra_table:
+            logger.info("Backfilling cluster_singles_infra from cluster_singles")
+            self.conn.executescript(SCHEMA_BACKFILL_INFRA)
+        if new_summary_table:
+            logger.info("Backfilling run_summary for completed runs")
+            with self.transaction():
+                for (run_id,) in self.conn.execute("SELECT run_id FROM runs WHERE status = 'completed'").fetchall():
+                    self._save_run_summary(run_id)
+        # Give the planner statistics for new indexes straight away
+        if new_covering_index:
+            self.conn.execute("ANALYZE cluster_singles")
+        if new_results_index:
+            self.conn.execute("ANALYZE cluster_results")
+        if new_metadata_index:
+            self.conn.execute("ANALYZE cluster_metadata")
+        self._optimize()
+
+    def _optimize(self):
+        # Best effort: a read-only copy of the database cannot store statistics
+        try:
+            self.conn.execute("PRAGMA optimize")
+        except sqlite3.Error as e:
+            logger.debug(f"PRAGMA optimize skipped: {e}")
+
+    def maybe_optimize(self):
+        """Run PRAGMA optimize once every OPTIMIZE_EVERY calls."""
+        with self._write_lock:
+            self._saves_since_optimize += 1
+            if self._saves_since_optimize >= OPTIMIZE_EVERY:
+                self._saves_since_optimize = 0
+                self._optimize()
     
     @contextmanager
     def transaction(self):
-        try:
-            yield self.conn
-            self.conn.commit()
-        except Exception as e:
-            self.conn.rollback()
-            logger.error(f"Transaction failed: {e}")
-            raise
+        # The writer runs in autocommit mode (isolation_level=None), so transactions
+        # are explicit; IMMEDIATE takes the write lock upfront instead of on first write.
+        with self._write_lock:
+            if self._in_batch:
+                # Inside batch(): a savepoint keeps this unit atomic without committing
+                self.conn.execute("SAVEPOINT unit")
+                try:
+                    yield self.conn
+                    self.conn.execute("RELEASE unit")
+                except Exception as e:
+                    self.conn.execute("ROLLBACK TO unit")
+                    self.conn.execute("RELEASE unit")
+                    logger.error(f"Transaction failed: {e}")
+                    raise
+                finally:
+                    self._invalidate_read_caches()
+                return
+
+            self._begin_immediate()
+            try:
+                yield self.conn
+                self.conn.execute("COMMIT")
+            except Exception as e:
+                self.conn.execute("ROLLBACK")
+                logger.error(f"Transaction failed: {e}")
+                raise
+            finally:
+                self._invalidate_read_caches()
+
+    def _begin_immediate(self):
+        # Waiting on another writer happens inside SQLite's busy handler (busy_timeout);
+        # surface long waits so lock contention shows up in the logs
+        started = time.monotonic()
+        self.conn.execute("BEGIN IMMEDIATE")
+        waited = time.monotonic() - started
+        if waited > SLOW_LOCK_WAIT:
+            logger.warning(f"Waited {waited:.1f}s for the database write lock")
+
+    @contextmanager
+    def batch(self):
+        """Group many writes into one transaction (one commit/WAL flush).
+
+        transaction() calls made inside the batch become savepoints, so a failing
+        save still rolls back on its own. Other threads' writes wait until the
+        batch ends.
+        """
+        with self._write_lock:
+            if self._in_batch:
+                yield self.conn
+                return
+            self._begin_immediate()
+            self._in_batch = True
+            try:
+                yield self.conn
+                self.conn.execute("COMMIT")
+            except Exception as e:
+                self.conn.execute("ROLLBACK")
+                logger.error(f"Batch failed: {e}")
+                raise
+            finally:
+                self._in_batch = False
+                self._invalidate_read_caches()
 
     def create_run(self, jira_ticket: str, total_clusters: int) -> int:
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            INSERT INTO runs (run_timestamp, jira_ticket, total_clusters, status)
-            VALUES (?, ?, ?, 'in_progress')
-        ''', (datetime.datetime.now().isoformat(), jira_ticket, total_clusters))
-        self.conn.commit()
-        run_id = cursor.lastrowid
+        with self.transaction():
+            run_id = self.conn.execute('''
+                INSERT INTO runs (run_timestamp, jira_ticket, total_clusters, status)
+                VALUES (?, ?, ?, 'in_progress')
+                RETURNING run_id
+            ''', (_now_iso(), jira_ticket, total_clusters)).fetchone()[0]
         logger.info(f"Run created: {run_id}")
         return run_id
 
-    def is_cluster_processed(self, run_id: int, mc_uid: str) -> bool:
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT status FROM cluster_results WHERE run_id = ? AND mc_uid = ?', (run_id, mc_uid))
-        row = cursor.fetchone()
-        return row and row['status'] == 'success'
-    
+    def get_processed_mc_uids(self, run_id: int) -> frozenset:
+        with self.reader() as conn:
+            return frozenset(row[0] for row in conn.execute(SQL_SELECT_PROCESSED, (run_id,)))
+
+    @staticmethod
+    def _prepare_result(result) -> Tuple[Tuple[float, float, float, float], List[tuple]]:
+        """One pass over result.clusters: (savings, percent, current, optimal) totals and singles rows."""
+        total_current = total_optimal = 0
+        singles = []
+        for current, optimal in result.clusters:
+            cur_total, opt_total = current.price.total, optimal.price.total
+            total_current += cur_total
+            total_optimal += opt_total
+            singles.append((current.uid, 'current', _json_dumps(current.infra),
+                            current.price.instance, current.price.storage, cur_total,
+                            detect_cloud_provider(current.infra)))
+            singles.append((optimal.uid, 'optimal', _json_dumps(optimal.infra),
+                            optimal.price.instance, optimal.price.storage, opt_total,
+                            detect_cloud_provider(optimal.infra)))
+        total_savings = total_current - total_optimal
+        savings_percent = (total_savings / total_current * 100) if total_current > 0 else 0
+        return (total_savings, savings_percent, total_current, total_optimal), singles
+
     def save_cluster_result(self, run_id: int, result) -> None:
-        with self.transaction():
-            cursor = self.conn.cursor()
-            total_current = sum(c.price.total for c, _ in result.clusters)
-            total_optimal = sum(o.price.total for _, o in result.clusters)
-            total_savings = total_current - total_optimal
-            savings_percent = (total_savings / total_current * 100) if total_current > 0 else 0
+        self.save_cluster_results_bulk(run_id, [result])
 
-            cursor.execute('''
-                INSERT OR REPLACE INTO cluster_results
-                (run_id, mc_uid, processed_at, status, total_savings, savings_percent)
-                VALUES (?, ?, ?, 'success', ?, ?)
-            ''', (run_id, result.uid, datetime.datetime.now().isoformat(), total_savings, savings_percent))
-            result_id = cursor.lastrowid
-
-            for current, optimal in result.clusters:
-                cursor.execute('''
-                    INSERT INTO cluster_singles
-                    (result_id, cluster_uid, cluster_type, infra_json,
-                     instance_price, storage_price, total_price, total_instances)
-                    VALUES (?, ?, 'current', ?, ?, ?, ?, ?)
-                ''', (result_id, current.uid, json.dumps(current.infra),
-                      current.price.instance, current.price.storage,
-                      current.price.total, sum(current.infra.values())))
-
-                cursor.execute('''
-                    INSERT INTO cluster_singles
-                    (result_id, cluster_uid, cluster_type, infra_json,
-                     instance_price, storage_price, total_price, total_instances)
-                    VALUES (?, ?, 'optimal', ?, ?, ?, ?, ?)
-                ''', (result_id, optimal.uid, json.dumps(optimal.infra),
-                      optimal.price.instance, optimal.price.storage,
-                      optimal.price.total, sum(optimal.infra.values())))
+    def save_cluster_results_bulk(self, run_id: int, results: Iterable) -> None:
+        """Save many results in one transaction with a single singles executemany."""
+        now = _now_iso()
+        prepared = [(result.uid,) + self._prepare_result(result) for result in results]
+
+        with self.transaction():
+            cursor = self._cur
+            result_ids = []
+            singles = []
+            for mc_uid, totals, rows in prepared:
+                result_id = cursor.execute(SQL_INSERT_RESULT, (run_id, mc_uid, now) + totals).fetchone()[0]
+                # Drop any rows from an earlier save of this result first
+                self._delete_singles(cursor, result_id)
+                result_ids.append((result_id,))
+                singles.extend((result_id,) + row for row in rows)
+            cursor.executemany(SQL_INSERT_SINGLE, singles)
+            cursor.executemany(SQL_INSERT_SINGLES_INFRA, result_ids)
+        self.maybe_optimize()
 
     def save_cluster_metadata(self, mc_uid: str, cluster_name: str = None,
                              cloud_provider: str = None, region: str = None,
@@ -186,219 +863,304 @@ class AADatabase:
                              total_nodes_count: int = None, os_version: str = None,
                              software_version: str = None, rof_enabled: bool = None) -> None:
         with self.transaction():
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO cluster_metadata
+            self.conn.execute('''
+                INSERT INTO cluster_metadata
                 (mc_uid, cluster_name, cloud_provider, region, account_id,
                  redis_version, multi_az, availability_zones, storage_type,
                  creation_date, shards_count, max_shards_count, total_storage_gb,
                  data_nodes_count, quorum_nodes_count, total_nodes_count,
                  os_version, software_version, rof_enabled, last_updated)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(mc_uid) DO UPDATE SET
+                    cluster_name = excluded.cluster_name, cloud_provider = excluded.cloud_provider,
+                    region = excluded.region, account_id = excluded.account_id,
+                    redis_version = excluded.redis_version, multi_az = excluded.multi_az,
+                    availability_zones = excluded.availability_zones, storage_type = excluded.storage_type,
+                    creation_date = excluded.creation_date, shards_count = excluded.shards_count,
+                    max_shards_count = excluded.max_shards_count, total_storage_gb = excluded.total_storage_gb,
+                    data_nodes_count = excluded.data_nodes_count,
+                    quorum_nodes_count = excluded.quorum_nodes_count,
+                    total_nodes_count = excluded.total_nodes_count, os_version = excluded.os_version,
+                    software_version = excluded.software_version, rof_enabled = excluded.rof_enabled,
+                    last_updated = excluded.last_updated
             ''', (mc_uid, cluster_name, cloud_provider, region, account_id,
-                  redis_version, 1 if multi_az else 0 if multi_az is not None else None,
+                  redis_version, _bool_or_null(multi_az),
                   availability_zones, storage_type,
                   creation_date, shards_count, max_shards_count, total_storage_gb,
                   data_nodes_count, quorum_nodes_count, total_nodes_count,
-                  os_version, software_version, 1 if rof_enabled else 0 if rof_enabled is not None else None,
-                  datetime.datetime.now().isoformat()))
+                  os_version, software_version, _bool_or_null(rof_enabled),
+                  _now_iso()))
+
+    def get_cached_optimal_plan(self, mc_uid: str, ttl_seconds: int) -> Optional[Dict]:
+        """Optimal plan saved for mc_uid within the last ttl_seconds, or None."""
+        cutoff = (_now() - datetime.timedelta(seconds=ttl_seconds)).isoformat(timespec='seconds')
+        with self.reader() as conn:
+            row = conn.execute(SQL_SELECT_OPTIMAL_PLAN, (mc_uid, cutoff)).fetchone()
+        return _json_loads(row[0]) if row else None
+
+    def save_optimal_plan(self, mc_uid: str, plan: Dict) -> None:
+        with self.transaction():
+            self.conn.execute(SQL_UPSERT_OPTIMAL_PLAN, (mc_uid, _json_dumps(plan), _now_iso()))
 
     def load_cluster_result(self, run_id: int, mc_uid: str) -> Optional[Dict]:
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT result_id FROM cluster_results WHERE run_id = ? AND mc_uid = ? AND status = ?',
-                      (run_id, mc_uid, 'success'))
-        row = cursor.fetchone()
-        if not row:
-            return None
-
-        cursor.execute('''
-            SELECT cluster_uid, cluster_type, infra_json, instance_price, storage_price, total_price
-            FROM cluster_singles WHERE result_id = ? ORDER BY single_id
-        ''', (row['result_id'],))
-
-        cluster_map = {}
-        for single in cursor.fetchall():
-            uid = single['cluster_uid']
-            cluster_data = {
-                'uid': uid,
-                'infra': json.loads(single['infra_json']),
-                'price': {'instance': single['instance_price'], 'storage': single['storage_price'],
-                         'total': single['total_price']}
-            }
-            if uid not in cluster_map:
-                cluster_map[uid] = {}
-            cluster_map[uid][single['cluster_type']] = cluster_data
-
-        clusters = [(data['current'], data['optimal']) for uid, data in cluster_map.items()
-                   if 'current' in data and 'optimal' in data]
-        return {'uid': mc_uid, 'clusters': clusters}
+        with self.reader() as conn:
+            row = conn.execute(SQL_SELECT_RESULT_ID, (run_id, mc_uid, 'success')).fetchone()
+            if not row:
+                return None
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            return {'uid': mc_uid,
+                    'clusters': _pair_singles(cursor.execute(SQL_SELECT_SINGLES, (row['result_id'],)))}
 
     def mark_cluster_failed(self, run_id: int, mc_uid: str, error_message: str) -> None:
         with self.transaction():
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                INSERT OR REPLACE INTO cluster_results
-                (run_id, mc_uid, processed_at, status, error_message)
-                VALUES (?, ?, ?, 'failed', ?)
-            ''', (run_id, mc_uid, datetime.datetime.now().isoformat(), error_message))
+            cursor = self._cur
+            result_id = cursor.execute(SQL_MARK_FAILED, (run_id, mc_uid, _now_iso(), error_message)).fetchone()[0]
+            self._delete_singles(cursor, result_id)
+
+    @staticmethod
+    def _delete_singles(cursor: sqlite3.Cursor, result_id: int) -> None:
+        cursor.execute(SQL_DELETE_SINGLES_INFRA, (result_id,))
+        cursor.execute(SQL_DELETE_SINGLES, (result_id,))
 
     def update_run_statistics(self, run_id: int) -> Dict[str, int]:
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT
-                COUNT(CASE WHEN status = 'success' THEN 1 END) as processed,
-                COUNT(CASE WHEN status = 'failed' THEN 1 END) as failed
-            FROM cluster_results WHERE run_id = ?
-        ''', (run_id,))
-        row = cursor.fetchone()
-        processed, failed = row['processed'], row['failed']
-        cursor.execute('UPDATE runs SET processed_clusters = ?, failed_clusters = ? WHERE run_id = ?',
-                      (processed, failed, run_id))
-        self.conn.commit()
-        return {'processed': processed, 'failed': failed}
+        with self.transaction():
+            row = self.conn.execute(SQL_RUN_COUNTS, (run_id,)).fetchone()
+            processed, failed = row['processed'], row['failed']
+            self.conn.execute('UPDATE runs SET processed_clusters = ?, failed_clusters = ? WHERE run_id = ?',
+                          (processed, failed, run_id))
+            return {'processed': processed, 'failed': failed}
 
     def complete_run(self, run_id: int, csv_path: str = None) -> None:
-        self.update_run_statistics(run_id)
-        cursor = self.conn.cursor()
-        cursor.execute('UPDATE runs SET status = ?, completed_at = ?, csv_path = ? WHERE run_id = ?',
-                      ('completed', datetime.datetime.now().isoformat(), csv_path, run_id))
-        self.conn.commit()
+        # Statistics and completion status are written in one statement/transaction
+        with self.transaction():
+            self.conn.execute(SQL_COMPLETE_RUN, (_now_iso(), csv_path, run_id))
+            self._save_run_summary(run_id)
+        # A finished run is the bulk load; refresh planner statistics for the next readers
+        self.conn.execute("ANALYZE")
         logger.info(f"Run {run_id} completed")
 
+    @staticmethod
+    def _compute_run_summary(conn: sqlite3.Connection, run_id: int) -> Dict[str, Any]:
+        summary = dict(conn.execute(SQL_SUMMARY_METRICS, (run_id,)).fetchone())
+        median = conn.execute(SQL_SUMMARY_MEDIAN, (run_id,)).fetchone()
+        summary['median_savings'] = median[0] if median else None
+
+        most_used_row = conn.execute(SQL_SUMMARY_MOST_USED_INSTANCE, (run_id,)).fetchone()
+        most_used = most_used_row['instance_type'] if most_used_row else None
+        summary['most_used_instance'] = most_used
+        summary['most_used_instance_count'] = most_used_row['clusters'] if most_used_row else None
+        summary['most_used_instance_avg_cost'] = conn.execute(
+            SQL_SUMMARY_INSTANCE_AVG_COST, (run_id, most_used)
+        ).fetchone()[0] if most_used else None
+
+        # The two providers with the most clusters (cloud_provider may be NULL)
+        providers = conn.execute(SQL_SUMMARY_PROVIDERS, (run_id,)).fetchall()
+        summary['attention_count'] = providers[0]['run_attention_count'] if providers else 0
+        summary['provider_cluster_count'] = providers[0]['provider_cluster_count'] if providers else 0
+        for prefix, index in (('top_provider', 0), ('second_provider', 1)):
+            provider = providers[index] if len(providers) > index else None
+            summary[prefix] = provider['cloud_provider'] if provider else None
+            summary[f'{prefix}_count'] = provider['cluster_count'] if provider else None
+            summary[f'{prefix}_cost'] = provider['total_cost'] if provider else None
+        return summary
+
+    def _save_run_summary(self, run_id: int) -> None:
+        # Called inside transaction(): the summary commits together with the run
+        summary = self._compute_run_summary(self.conn, run_id)
+        self.conn.execute(SQL_SAVE_RUN_SUMMARY, (run_id,) + tuple(summary[f] for f in RUN_SUMMARY_FIELDS))
+
+    def get_run_summary(self, run_id: int) -> Dict[str, Any]:
+        """Dashboard aggregates for a run (RUN_SUMMARY_FIELDS and RUN_SUMMARY_DERIVED).
+
+        Read from run_summary; runs without a stored row (not completed yet) are
+        computed on the fly without writing, so read-only copies work too.
+        """
+        with self.reader() as conn:
+            row = conn.execute(SQL_SELECT_RUN_SUMMARY, (run_id,)).fetchone()
+            if row is not None:
+                return dict(row)
+            summary = self._compute_run_summary(conn, run_id)
+            summary.update(conn.execute(SQL_RUN_SUMMARY_DERIVED, (
+                summary['total_savings'], summary['total_current'],
+                summary['total_optimal'], summary['storage_savings'])).fetchone())
+            return summary
+
+    def iter_results_for_run(self, run_id: int) -> Iterator[Dict]:
+        """Yield one {'uid', 'clusters'} dict per successful cluster, streaming rows."""
+        with self.reader() as conn:
+            # Tuple rows, fetched READ_BATCH_ROWS at a time
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.arraysize = READ_BATCH_ROWS
+            cursor.execute(SQL_SELECT_RUN_RESULTS, (run_id,))
+            rows = chain.from_iterable(iter(cursor.fetchmany, []))
+            for mc_uid, group in groupby(rows, key=itemgetter(0)):
+                yield {'uid': mc_uid, 'clusters': _pair_singles(group)}
+
     def get_all_results_for_run(self, run_id: int) -> List[Dict]:
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT cr.mc_uid, cs.cluster_uid, cs.cluster_type, cs.infra_json,
-                   cs.instance_price, cs.storage_price, cs.total_price
-            FROM cluster_results cr
-            JOIN cluster_singles cs ON cr.result_id = cs.result_id
-            WHERE cr.run_id = ? AND cr.status = 'success'
-            ORDER BY cr.processed_at, cs.single_id
-        ''', (run_id,))
-
-        results_map = {}
-        for row in cursor.fetchall():
-            mc_uid = row['mc_uid']
-            if mc_uid not in results_map:
-                results_map[mc_uid] = {'uid': mc_uid, 'cluster_map': {}}
-
-            cluster_uid = row['cluster_uid']
-            cluster_data = {
-                'uid': cluster_uid,
-                'infra': json.loads(row['infra_json']),
-                'price': {'instance': row['instance_price'], 'storage': row['storage_price'],
-                         'total': row['total_price']}
-            }
-            if cluster_uid not in results_map[mc_uid]['cluster_map']:
-                results_map[mc_uid]['cluster_map'][cluster_uid] = {}
-            results_map[mc_uid]['cluster_map'][cluster_uid][row['cluster_type']] = cluster_data
-
-        results = []
-        for mc_uid, data in results_map.items():
-            clusters = [(types['current'], types['optimal'])
-                       for uid, types in data['cluster_map'].items()
-                       if 'current' in types and 'optimal' in types]
-            results.append({'uid': mc_uid, 'clusters': clusters})
-        return results
+        return list(self.iter_results_for_run(run_id))
+
+    def _invalidate_read_caches(self):
+        self._history_cache.cache_clear()
+        self._top_savings_cache.cache_clear()
+
+    def _read_cache_state(self) -> tuple:
+        """(data_version, date) shared by every thread; part of each read cache key.
+
+        PRAGMA data_version is only comparable within one connection, so all threads
+        ask the same dedicated connection; it changes once any other connection commits.
+        Keyed on the date too: cached rows carry age_days computed against 'now'.
+        """
+        with self._read_cache_lock:
+            if self._watch_conn is None:
+                self._watch_conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                                   isolation_level=None)
+            state = (self._watch_conn.execute("PRAGMA data_version").fetchone()[0], datetime.date.today())
+            if state != self._last_read_cache_state:
+                # Entries under the old state can no longer be hit; free them
+                self._last_read_cache_state = state
+                self._invalidate_read_caches()
+        return state
 
     def get_cluster_history(self, mc_uid: str, limit: int = 10) -> List[Dict]:
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT r.run_timestamp AS timestamp, r.jira_ticket,
-                   cr.total_savings AS savings, cr.savings_percent, cr.result_id
-            FROM cluster_results cr
-            JOIN runs r ON cr.run_id = r.run_id
-            WHERE cr.mc_uid = ? AND cr.status = 'success'
-            ORDER BY r.run_timestamp DESC LIMIT ?
-        ''', (mc_uid, limit))
-
-        history = []
-        for row in cursor.fetchall():
-            cursor.execute('''
-                SELECT
-                    SUM(CASE WHEN cluster_type = 'current' THEN total_price ELSE 0 END) as current_price,
-                    SUM(CASE WHEN cluster_type = 'optimal' THEN total_price ELSE 0 END) as optimal_price
-                FROM cluster_singles WHERE result_id = ?
-            ''', (row['result_id'],))
-            prices = cursor.fetchone()
-            history.append({
-                'timestamp': row['timestamp'],
-                'jira_ticket': row['jira_ticket'],
-                'current_price': round(prices['current_price'] or 0, 2),
-                'optimal_price': round(prices['optimal_price'] or 0, 2),
-                'savings': round(row['savings'], 2),
-                'savings_percent': round(row['savings_percent'], 2)
-            })
-        return history
+        # Copies, so callers can annotate the dicts without touching the cache
+        return [dict(entry) for entry in self._history_cache(self._read_cache_state(), mc_uid, limit)]
+
+    def _get_cluster_history_impl(self, state: tuple, mc_uid: str, limit: int) -> Tuple[Dict, ...]:
+        # state only keys the cache entry
+        with self.reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_SELECT_HISTORY, (mc_uid, limit))
+
+            history = []
+            for row in cursor.fetchall():
+                history.append({
+                    'timestamp': row['timestamp'],
+                    'jira_ticket': row['jira_ticket'],
+                    'current_price': round(row['current_price'] or 0, 2),
+                    'optimal_price': round(row['optimal_price'] or 0, 2),
+                    'savings': round(row['savings'], 2),
+                    'savings_percent': round(row['savings_percent'], 2)
+                })
+            return tuple(history)
 
     def get_total_savings_trend(self, limit: int = 10) -> List[Dict]:
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT r.run_timestamp AS timestamp, r.jira_ticket,
-                   SUM(cr.total_savings) AS total_savings,
-                   SUM(CASE WHEN cs.cluster_type = 'current' THEN cs.total_price ELSE 0 END) as total_current,
-                   SUM(CASE WHEN cs.cluster_type = 'optimal' THEN cs.total_price ELSE 0 END) as total_optimal
-            FROM runs r
-            JOIN cluster_results cr ON r.run_id = cr.run_id
-            JOIN cluster_singles cs ON cr.result_id = cs.result_id
-            WHERE r.status = 'completed' AND cr.status = 'success' AND cr.total_savings > 0
-            GROUP BY r.run_id ORDER BY r.run_timestamp DESC LIMIT ?
-        ''', (limit,))
-
-        trend = []
-        for row in cursor.fetchall():
-            tc, to, ts = row['total_current'] or 0, row['total_optimal'] or 0, row['total_savings'] or 0
-            trend.append({
-                'timestamp': row['timestamp'],
-                'jira_ticket': row['jira_ticket'],
-                'total_current': round(tc, 2),
-                'total_optimal': round(to, 2),
-                'total_savings': round(ts, 2),
-                'savings_percent': round((tc - to) / tc * 100, 2) if tc > 0 else 0
-            })
-        return trend
-
-    def get_top_savings_opportunities(self, run_id: int = None, limit: int = None) -> List[Dict]:
-        cursor = self.conn.cursor()
-        if run_id is None:
-            cursor.execute('SELECT run_id FROM runs WHERE status = ? ORDER BY run_timestamp DESC LIMIT 1',
-                          ('completed',))
-            row = cursor.fetchone()
-            if not row:
-                return []
-            run_id = row['run_id']
-
-        query = '''
-            SELECT cr.mc_uid, cr.total_savings, cr.savings_percent,
-                   SUM(CASE WHEN cs.cluster_type = 'current' THEN cs.total_price ELSE 0 END) as current_price,
-                   SUM(CASE WHEN cs.cluster_type = 'optimal' THEN cs.total_price ELSE 0 END) as optimal_price,
-                   cm.cloud_provider, COALESCE(cm.software_version, cm.redis_version) as software_version,
-                   cm.cluster_name, cm.region, cm.creation_date
-            FROM cluster_results cr
-            JOIN cluster_singles cs ON cr.result_id = cs.result_id
-            LEFT JOIN cluster_metadata cm ON cr.mc_uid = cm.mc_uid
-            WHERE cr.run_id = ? AND cr.status = 'success'
-            GROUP BY cr.mc_uid ORDER BY cr.total_savings DESC
-        '''
-        cursor.execute(query + ('' if limit is None else ' LIMIT ?'),
-                      (run_id, limit) if limit else (run_id,))
-
-        return [{
-            'mc_uid': row['mc_uid'],
-            'current_price': round(row['current_price'], 2),
-            'optimal_price': round(row['optimal_price'], 2),
-            'savings': round(row['total_savings'], 2),
-            'savings_percent': round(row['savings_percent'], 2),
-            'cloud_provider': row['cloud_provider'],
-            'software_version': row['software_version'],
-            'cluster_name': row['cluster_name'],
-            'region': row['region'],
-            'creation_date': row['creation_date']
-        } for row in cursor.fetchall()]
+        with self.reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT run_timestamp, jira_ticket,
+                       total_savings, total_current, total_optimal
+                FROM runs
+                WHERE status = 'completed' AND total_savings IS NOT NULL
+                ORDER BY run_timestamp DESC, run_id DESC LIMIT ?
+            ''', (limit,))
+            return [_trend_entry(row) for row in cursor.fetchall()]
+
+    def get_runs_overview(self, limit: int = 10) -> Tuple[List[Dict], List[Dict]]:
+        """(savings trend, runs history) for the last `limit` runs, newest first.
+
+        The trend covers completed runs with totals, as get_total_savings_trend;
+        the history covers runs of any status (RUN_HISTORY_FIELDS).
+        """
+        trend, history = [], []
+        with self.reader() as conn:
+            for row in conn.execute(SQL_SELECT_RUNS_OVERVIEW, (limit, limit)):
+                if row['kind'] == 'trend':
+                    trend.append(_trend_entry(row))
+                else:
+                    history.append({field: row[field] for field in RUN_HISTORY_FIELDS})
+        return trend, history
+
+    def get_top_savings_opportunities(self, run_id: int = None, limit: int = None,
+                                      cloud_provider: str = None,
+                                      software_version: str = None) -> List[Dict]:
+        return [dict(entry) for entry in
+                self._top_savings_cache(self._read_cache_state(), run_id, limit,
+                                        cloud_provider, software_version)]
+
+    @staticmethod
+    def _resolve_run_id(conn: sqlite3.Connection, run_id: Optional[int]) -> Optional[int]:
+        """Return run_id, or the latest completed run when it is None."""
+        if run_id is not None:
+            return run_id
+        row = conn.execute('SELECT run_id FROM runs WHERE status = ? ORDER BY run_timestamp DESC, run_id DESC LIMIT 1',
+                           ('completed',)).fetchone()
+        return row['run_id'] if row else None
+
+    def _get_top_savings_impl(self, state: tuple, run_id: Optional[int], limit: Optional[int],
+                              cloud_provider: Optional[str],
+                              software_version: Optional[str]) -> Tuple[Dict, ...]:
+        # state only keys the cache entry
+        with self.reader() as conn:
+            run_id = self._resolve_run_id(conn, run_id)
+            if run_id is None:
+                return ()
+
+            query = '''
+                SELECT cr.mc_uid, cr.total_savings, cr.savings_percent,
+                       cr.total_current AS current_price, cr.total_optimal AS optimal_price,
+                       cm.cloud_provider, COALESCE(cm.software_version, cm.redis_version) as software_version,
+                       cm.cluster_name, cm.region, cm.creation_date,
+                       CAST(julianday('now', 'localtime') - julianday(cm.creation_date) AS INTEGER) AS age_days
+                FROM cluster_results cr
+                LEFT JOIN cluster_metadata cm ON cr.mc_uid = cm.mc_uid
+                WHERE cr.run_id = ? AND cr.status = 'success'
+            '''
+            params = [run_id]
+            if cloud_provider is not None:
+                query += ' AND cm.cloud_provider = ?'
+                params.append(cloud_provider)
+            if software_version is not None:
+                query += ' AND COALESCE(cm.software_version, cm.redis_version) = ?'
+                params.append(software_version)
+            query += ' ORDER BY cr.total_savings DESC, cr.mc_uid'
+            if limit is not None:
+                query += ' LIMIT ?'
+                params.append(limit)
+            cursor = conn.execute(query, params)
+
+            return tuple({
+                'mc_uid': row['mc_uid'],
+                'current_price': round(row['current_price'], 2),
+                'optimal_price': round(row['optimal_price'], 2),
+                'savings': round(row['total_savings'], 2),
+                'savings_percent': round(row['savings_percent'], 2),
+                'cloud_provider': row['cloud_provider'],
+                'software_version': row['software_version'],
+                'cluster_name': row['cluster_name'],
+                'region': row['region'],
+                'creation_date': row['creation_date'],
+                'age_days': row['age_days']
+            } for row in cursor.fetchall())
+
+    def get_top_savings_filter_options(self, run_id: int = None) -> Tuple[List[str], List[str]]:
+        """Distinct cloud providers and software versions among a run's successful clusters."""
+        with self.reader() as conn:
+            run_id = self._resolve_run_id(conn, run_id)
+            if run_id is None:
+                return [], []
+            rows = conn.execute('''
+                SELECT DISTINCT cm.cloud_provider, COALESCE(cm.software_version, cm.redis_version) AS software_version
+                FROM cluster_metadata cm
+                WHERE cm.mc_uid IN (SELECT mc_uid FROM cluster_results WHERE run_id = ? AND status = 'success')
+            ''', (run_id,)).fetchall()
+        providers = sorted({row['cloud_provider'] for row in rows if row['cloud_provider']})
+        versions = sorted({row['software_version'] for row in rows if row['software_version']}, reverse=True)
+        return providers, versions
 
     def close(self):
-        if self.conn:
-            self.conn.close()
+        if getattr(self._local, 'conn', None) is not None:
+            self._optimize()
+        with self._connections_lock:
+            connections, self._connections = self._connections, {}
+        for conn in connections.values():
+            conn.close()
+        with self._read_cache_lock:
+            if self._watch_conn is not None:
+                self._watch_conn.close()
+                self._watch_conn = None
+        self._local = threading.local()
 
     def __enter__(self):
         return self
@@ -407,3 +1169,77 @@ class AADatabase:
         self.close()
         return False
 
+
+class BackgroundWriter:
+    """Funnel writes from many threads through one thread that commits them in batches.
+
+    Mirrors the AADatabase methods used during a run; writes are queued and
+    return immediately, reads go straight to db. The writer thread takes up to batch_size queued writes
+    (waiting at most flush_interval for more) and runs them in one db.batch(),
+    each as its own savepoint, so a failing write is logged and rolled back alone.
+    """
+
+    _STOP = object()
+
+    def __init__(self, db: AADatabase, batch_size: int = WRITER_BATCH_SIZE,
+                 flush_interval: float = WRITER_FLUSH_INTERVAL):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='aa-db-writer', daemon=True)
+        self._thread.start()
+
+    def save_cluster_metadata(self, *args, **kwargs) -> None:
+        self._queue.put((self.db.save_cluster_metadata, args, kwargs))
+
+    def save_cluster_result(self, run_id: int, result) -> None:
+        self._queue.put((self.db.save_cluster_result, (run_id, result), {}))
+
+    def save_optimal_plan(self, mc_uid: str, plan: Dict) -> None:
+        self._queue.put((self.db.save_optimal_plan, (mc_uid, plan), {}))
+
+    def get_cached_optimal_plan(self, mc_uid: str, ttl_seconds: int) -> Optional[Dict]:
+        return self.db.get_cached_optimal_plan(mc_uid, ttl_seconds)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            op = self._queue.get()
+            if op is self._STOP:
+                break
+            ops = [op]
+            deadline = time.monotonic() + self.flush_interval
+            while len(ops) < self.batch_size:
+                try:
+                    op = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if op is self._STOP:
+                    stopping = True
+                    break
+                ops.append(op)
+            self._write(ops)
+
+    def _write(self, ops: List[tuple]):
+        try:
+            with self.db.batch():
+                for func, args, kwargs in ops:
+                    try:
+                        func(*args, **kwargs)
+                    except Exception as e:
+                        logger.error(f"Queued {func.__name__} failed: {e}")
+        except Exception as e:
+            logger.error(f"Writer batch of {len(ops)} writes failed: {e}")
+
+    def close(self):
+        """Write everything still queued, then stop the writer thread."""
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
@@ -21,15 +21,21 @@ See README.md for full documentation.
 import os
 import sys
 import time
+import random
 import datetime
 import argparse
 import logging
+import atexit
+import queue
 import subprocess
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, Union, FrozenSet
 from functools import wraps
-from collections import Counter
+from itertools import islice
+from logging.handlers import QueueHandler, QueueListener, MemoryHandler
 from dataclasses import dataclass
+from types import MappingProxyType
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 
 # Get script directory
@@ -50,7 +56,7 @@ try:
 except ImportError:
     pass  # python-dotenv not installed, use environment variables
 
-from aa_database import AADatabase
+from aa_database import AADatabase, BackgroundWriter
 
 
 # ============================================================================
@@ -109,23 +115,50 @@ DB_PATH = os.getenv('DB_PATH', os.path.join(script_dir, 'aa_report_cache.db'))
 # LOGGING
 # ============================================================================
 
+# Buffered file handler installed by setup_logging(); flushed by flush_logs()
+_log_buffer: Optional[MemoryHandler] = None
+
+
 def setup_logging(log_level: str = 'INFO') -> logging.Logger:
+    global _log_buffer
     # Create logs directory in script directory
     log_dir = os.path.join(script_dir, 'logs')
     os.makedirs(log_dir, exist_ok=True)
     log_file = os.path.join(log_dir, f'aa_report_automation_{datetime.datetime.now().strftime("%Y-%m-%d")}.log')
 
-    logging.basicConfig(
-        level=getattr(logging, log_level.upper()),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[logging.FileHandler(log_file), logging.StreamHandler(sys.stdout)]
-    )
+    if not logging.getLogger().handlers:
+        # Workers only enqueue records; a single listener thread does the file/stdout I/O
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        file_handler = logging.FileHandler(log_file)
+        stream_handler = logging.StreamHandler(sys.stdout)
+        file_handler.setFormatter(formatter)
+        stream_handler.setFormatter(formatter)
+
+        # Buffer file writes; flush every 50 records, immediately on WARNING,
+        # and whenever flush_logs() is called after a batch commits
+        _log_buffer = MemoryHandler(capacity=50, flushLevel=logging.WARNING,
+                                    target=file_handler, flushOnClose=True)
+
+        log_queue = queue.Queue(-1)
+        listener = QueueListener(log_queue, _log_buffer, stream_handler)
+        listener.start()
+        atexit.register(listener.stop)
+
+        root = logging.getLogger()
+        root.setLevel(getattr(logging, log_level.upper()))
+        root.addHandler(QueueHandler(log_queue))
 
     logger = logging.getLogger('aa_report_automation')
     logger.info(f"Log: {log_file}")
     return logger
 
 
+def flush_logs() -> None:
+    """Write out buffered log records, e.g. once a batch of results is committed."""
+    if _log_buffer is not None:
+        _log_buffer.flush()
+
+
 logger = setup_logging()
 
 
@@ -145,11 +178,13 @@ class Config:
     API_CALLS_PER_SECOND: float = 2.0
     MAX_WORKERS: int = 5
     ENABLE_PARALLEL: bool = False
+    DB_BATCH_SIZE: int = 25  # Clusters saved per database transaction
+    OPTIMAL_PLAN_CACHE_TTL: int = 3600  # Seconds a saved optimal plan is reused; 0 disables
 
     # GCS Upload configuration
     GCS_BUCKET_NAME: str = GCS_BUCKET_NAME
     ENABLE_GCS_UPLOAD: bool = ENABLE_GCS_UPLOAD
-    EXCLUDE_UIDS: List[str] = []
+    EXCLUDE_UIDS: FrozenSet[str] = frozenset()
 
     @classmethod
     def validate(cls) -> bool:
@@ -169,20 +204,23 @@ class Config:
 class RateLimiter:
     def __init__(self, calls_per_second: float = 2.0):
         self.min_interval = 1.0 / calls_per_second
-        self.last_call = 0.0
+        self.next_call = float('-inf')
         self.lock = threading.Lock()
 
     def wait(self):
+        # Reserve the next slot under the lock, then sleep outside it so
+        # waiting workers do not queue up behind each other's sleeps
         with self.lock:
-            current_time = time.time()
-            elapsed = current_time - self.last_call
-            if elapsed < self.min_interval:
-                time.sleep(self.min_interval - elapsed)
-            self.last_call = time.time()
+            slot = max(self.next_call, time.monotonic())
+            self.next_call = slot + self.min_interval
+        sleep_for = slot - time.monotonic()
+        if sleep_for > 0:
+            time.sleep(sleep_for)
 
 
 def retry(max_tries: int = 3, delay_seconds: int = 5,
-          backoff_factor: int = 2, exceptions: Tuple = (Exception,)):
+          backoff_factor: int = 2, exceptions: Tuple = (Exception,),
+          max_delay: int = 30, jitter: float = 0.5):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
@@ -194,8 +232,10 @@ def retry(max_tries: int = 3, delay_seconds: int = 5,
                     if attempt == max_tries:
                         logger.error(f"{func.__name__} failed after {max_tries} attempts: {e}")
                         raise
-                    logger.warning(f"{func.__name__} attempt {attempt}/{max_tries} failed, retrying in {delay}s...")
-                    time.sleep(delay)
+                    # Jitter keeps concurrent workers from retrying in lockstep
+                    sleep_for = min(max_delay, delay) * (1 + random.uniform(0, jitter))
+                    logger.warning(f"{func.__name__} attempt {attempt}/{max_tries} failed, retrying in {sleep_for:.1f}s...")
+                    time.sleep(sleep_for)
                     delay *= backoff_factor
         return wrapper
     return decorator
@@ -236,16 +276,15 @@ class RCPClientWrapper:
             logger.error(f"Failed to connect to RCP: {e}")
             raise
 
-    def get_all_multi_clusters(self) -> List[Dict[str, Any]]:
+    def get_all_multi_clusters(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Multi-clusters not in Config.EXCLUDE_UIDS, at most limit of them if given."""
         result = self.client.get_multi_clusters().result()
         logger.info(f"Retrieved {len(result)} multi-clusters")
-        return result
-
-    def get_multi_cluster_status(self, mc_uid: str) -> str:
-        return self.client.get_multi_cluster_status(mc_uid).result().marshal()['status']
-
-    def is_active(self, mc_uid: str) -> bool:
-        return self.get_multi_cluster_status(mc_uid) == 'done'
+        # The RCP API has no server-side paging; stop filtering once limit is reached
+        clusters = (mc for mc in result if mc['multi_cluster_uid'] not in Config.EXCLUDE_UIDS)
+        if limit is not None and limit > 0:
+            clusters = islice(clusters, limit)
+        return list(clusters)
 
     def get_multi_cluster_blueprint(self, mc_uid: str) -> Dict[str, Any]:
         return self.client.get_multi_cluster_blueprint(multi_cluster_uid=mc_uid).result().marshal()
@@ -259,29 +298,17 @@ class RCPClientWrapper:
         ).result().marshal()['result']
 
 
-def convert_blueprint_to_dataclass(mc_uid: str, mc_bp: Dict[str, Any]) -> MultiCluster:
+def convert_mc_blueprint_to_dataclass(mc_uid: str, mc_bp: Dict[str, Any]) -> MultiCluster:
     singles = []
     for single in mc_bp['blueprints']:
         blueprint = single['blueprint']
         cluster_uid = single['cluster_uid']
         instance_price = blueprint['usd_per_month']['cluster']
         storage_price = blueprint['usd_per_month']['storage']
-        all_instances = Counter([node['instance_type'] for node in blueprint['nodes']])
-        infra = dict(all_instances)
-        price = Price(storage=round(storage_price, 2), instance=round(instance_price, 2))
-        singles.append(Cluster(uid=cluster_uid, infra=infra, price=price))
-    return MultiCluster(uid=mc_uid, clusters=singles)
-
-
-def convert_plan_to_dataclass(mc_uid: str, optimal_plan: Dict[str, Any]) -> MultiCluster:
-    singles = []
-    for single in optimal_plan['blueprints']:
-        blueprint = single['blueprint']
-        cluster_uid = single['cluster_uid']
-        instance_price = blueprint['usd_per_month']['cluster']
-        storage_price = blueprint['usd_per_month']['storage']
-        all_instances = Counter([node['instance_type'] for node in blueprint['nodes']])
-        infra = dict(all_instances)
+        infra = {}
+        for node in blueprint['nodes']:
+            instance_type = node['instance_type']
+            infra[instance_type] = infra.get(instance_type, 0) + 1
         price = Price(storage=round(storage_price, 2), instance=round(instance_price, 2))
         singles.append(Cluster(uid=cluster_uid, infra=infra, price=price))
     return MultiCluster(uid=mc_uid, clusters=singles)
@@ -291,6 +318,31 @@ def convert_plan_to_dataclass(mc_uid: str, optimal_plan: Dict[str, Any]) -> Mult
 # METADATA EXTRACTION
 # ============================================================================
 
+# Every metadata field, all unset; extract_cluster_metadata copies and fills it
+_METADATA_TEMPLATE = MappingProxyType({
+    'mc_uid': None,
+    'cluster_name': None,
+    'cloud_provider': None,
+    'region': None,
+    'account_id': None,
+    'redis_version': None,
+    'multi_az': None,
+    'availability_zones': None,
+    'storage_type': None,
+    # New fields
+    'creation_date': None,
+    'shards_count': None,
+    'max_shards_count': None,
+    'total_storage_gb': None,
+    'data_nodes_count': None,
+    'quorum_nodes_count': None,
+    'total_nodes_count': None,
+    'os_version': None,
+    'software_version': None,
+    'rof_enabled': None
+})
+
+
 def extract_cluster_metadata(mc_uid: str, blueprint: Dict) -> Dict:
     """
     Extract metadata from blueprint response.
@@ -302,28 +354,8 @@ def extract_cluster_metadata(mc_uid: str, blueprint: Dict) -> Dict:
     Returns:
         Dict with metadata fields for save_cluster_metadata()
     """
-    metadata = {
-        'mc_uid': mc_uid,
-        'cluster_name': None,
-        'cloud_provider': None,
-        'region': None,
-        'account_id': None,
-        'redis_version': None,
-        'multi_az': None,
-        'availability_zones': None,
-        'storage_type': None,
-        # New fields
-        'creation_date': None,
-        'shards_count': None,
-        'max_shards_count': None,
-        'total_storage_gb': None,
-        'data_nodes_count': None,
-        'quorum_nodes_count': None,
-        'total_nodes_count': None,
-        'os_version': None,
-        'software_version': None,
-        'rof_enabled': None
-    }
+    metadata = dict(_METADATA_TEMPLATE)
+    metadata['mc_uid'] = mc_uid
 
     if not blueprint or 'blueprints' not in blueprint or not blueprint['blueprints']:
         return metadata
@@ -382,6 +414,19 @@ def extract_cluster_metadata(mc_uid: str, blueprint: Dict) -> Dict:
     data_nodes = 0
     quorum_nodes = 0
 
+    # Storage layout differs per provider; resolve it once rather than per node
+    type_key, size_key = 'type', 'size'
+    if provider == 'aws':
+        # AWS uses ebs_volume (singular)
+        get_disks = lambda node: (node.get('ebs_volume', {}),)
+        type_key, size_key = 'volume_type', 'volume_size'
+    elif provider in ('gcp', 'azure'):
+        # GCP and Azure use gcp_disks / azure_disks (plural, array)
+        disks_key = f'{provider}_disks'
+        get_disks = lambda node: node.get(disks_key, [])
+    else:
+        get_disks = lambda node: ()
+
     for node in nodes:
         # Availability zones
         if 'availability_zone' in node:
@@ -393,30 +438,12 @@ def extract_cluster_metadata(mc_uid: str, blueprint: Dict) -> Dict:
         else:
             data_nodes += 1
 
-        # Storage types and sizes (different for each provider)
-        if provider == 'aws':
-            # AWS uses ebs_volume (singular)
-            ebs = node.get('ebs_volume', {})
-            if 'volume_type' in ebs:
-                storage_types.add(ebs['volume_type'])
-            if 'volume_size' in ebs:
-                total_storage_gb += ebs['volume_size']
-        elif provider == 'gcp':
-            # GCP uses gcp_disks (plural, array)
-            gcp_disks = node.get('gcp_disks', [])
-            for disk in gcp_disks:
-                if 'type' in disk:
-                    storage_types.add(disk['type'])
-                if 'size' in disk:
-                    total_storage_gb += disk['size']
-        elif provider == 'azure':
-            # Azure uses azure_disks (plural, array)
-            azure_disks = node.get('azure_disks', [])
-            for disk in azure_disks:
-                if 'type' in disk:
-                    storage_types.add(disk['type'])
-                if 'size' in disk:
-                    total_storage_gb += disk['size']
+        # Storage types and sizes
+        for disk in get_disks(node):
+            if type_key in disk:
+                storage_types.add(disk[type_key])
+            if size_key in disk:
+                total_storage_gb += disk[size_key]
 
     metadata['availability_zones'] = ','.join(sorted(azs)) if azs else ''
     metadata['storage_type'] = ','.join(sorted(storage_types)) if storage_types else ''
@@ -432,36 +459,100 @@ def extract_cluster_metadata(mc_uid: str, blueprint: Dict) -> Dict:
 # CLUSTER PROCESSING
 # ============================================================================
 
+class PendingWrites:
+    """Hold one batch's writes so the RCP calls happen outside the database transaction.
+
+    Mirrors the AADatabase methods used by handle_aa_cluster; writes are kept in
+    memory until commit(), reads go straight to db.
+    """
+
+    def __init__(self, db: AADatabase):
+        self.db = db
+        self.metadata: List[Dict[str, Any]] = []
+        self.plans: List[Tuple[str, Dict]] = []
+        self.results: List[MultiClusterResult] = []
+
+    def save_cluster_metadata(self, **metadata) -> None:
+        self.metadata.append(metadata)
+
+    def save_cluster_result(self, run_id: int, result: MultiClusterResult) -> None:
+        self.results.append(result)
+
+    def save_optimal_plan(self, mc_uid: str, plan: Dict) -> None:
+        self.plans.append((mc_uid, plan))
+
+    def get_cached_optimal_plan(self, mc_uid: str, ttl_seconds: int) -> Optional[Dict]:
+        return self.db.get_cached_optimal_plan(mc_uid, ttl_seconds)
+
+    def commit(self, run_id: int) -> int:
+        """Write everything held in one db.batch(); returns the number of results saved."""
+        saved = 0
+        with self.db.batch():
+            for metadata in self.metadata:
+                try:
+                    self.db.save_cluster_metadata(**metadata)
+                except Exception as e:
+                    logger.error(f"Failed to save metadata for {metadata['mc_uid']}: {e}")
+            for mc_uid, plan in self.plans:
+                try:
+                    self.db.save_optimal_plan(mc_uid, plan)
+                except Exception as e:
+                    logger.error(f"Failed to save optimal plan for {mc_uid}: {e}")
+            if self.results:
+                try:
+                    self.db.save_cluster_results_bulk(run_id, self.results)
+                    saved = len(self.results)
+                except Exception as e:
+                    # Retry one by one (each its own savepoint) so only the bad result is lost
+                    logger.warning(f"Bulk save of {len(self.results)} results failed ({e}), saving one by one")
+                    for result in self.results:
+                        try:
+                            self.db.save_cluster_result(run_id, result)
+                            saved += 1
+                        except Exception as e:
+                            logger.error(f"Failed to save result for {result.uid}: {e}")
+        self.metadata, self.plans, self.results = [], [], []
+        return saved
+
+
 def handle_aa_cluster(rcp_client: RCPClientWrapper, mc_uid: str,
-                     db: AADatabase, run_id: int, rate_limiter: RateLimiter) -> Optional[MultiClusterResult]:
+                     db: Union[AADatabase, BackgroundWriter, PendingWrites], run_id: int,
+                     rate_limiter: RateLimiter) -> Optional[MultiClusterResult]:
     logger.info(f"Processing {mc_uid}")
     try:
-        if db.is_cluster_processed(run_id, mc_uid):
-            logger.info(f"{mc_uid} already processed, skipping")
-            return None
-
+        # No separate status call: a cluster that is not active has no blueprints
         rate_limiter.wait()
-        if not rcp_client.is_active(mc_uid):
+        current_bp = rcp_client.get_multi_cluster_blueprint(mc_uid)
+        if not current_bp.get('blueprints'):
             logger.warning(f"{mc_uid} not active, skipping")
             return None
 
-        rate_limiter.wait()
-        current_bp = rcp_client.get_multi_cluster_blueprint(mc_uid)
-
         # Extract and save metadata
         metadata = extract_cluster_metadata(mc_uid, current_bp)
         db.save_cluster_metadata(**metadata)
         logger.debug(f"Saved metadata for {mc_uid}: {metadata.get('cluster_name', 'N/A')}")
 
-        current_mc = convert_blueprint_to_dataclass(mc_uid, current_bp)
+        current_mc = convert_mc_blueprint_to_dataclass(mc_uid, current_bp)
 
-        rate_limiter.wait()
-        optimal_plan = rcp_client.plan_optimal_multi_cluster(mc_uid)
-        optimal_mc = convert_plan_to_dataclass(mc_uid, optimal_plan)
+        optimal_plan = None
+        if Config.OPTIMAL_PLAN_CACHE_TTL > 0:
+            optimal_plan = db.get_cached_optimal_plan(mc_uid, Config.OPTIMAL_PLAN_CACHE_TTL)
+        if optimal_plan is None:
+            rate_limiter.wait()
+            optimal_plan = rcp_client.plan_optimal_multi_cluster(mc_uid)
+            db.save_optimal_plan(mc_uid, optimal_plan)
+        else:
+            logger.debug(f"Using cached optimal plan for {mc_uid}")
+        optimal_mc = convert_mc_blueprint_to_dataclass(mc_uid, optimal_plan)
 
+        optimal_by_uid = {c.uid: c for c in optimal_mc.clusters}
         clusters = []
         for current_single in current_mc.clusters:
-            matching_optimal = [c for c in optimal_mc.clusters if current_single.uid == c.uid][0]
+            try:
+                matching_optimal = optimal_by_uid[current_single.uid]
+            except KeyError:
+                logger.warning(f"{mc_uid}: no optimal plan for cluster {current_single.uid}, skipping")
+                continue
             clusters.append((current_single, matching_optimal))
 
         result = MultiClusterResult(uid=mc_uid, clusters=clusters)
@@ -474,26 +565,50 @@ def handle_aa_cluster(rcp_client: RCPClientWrapper, mc_uid: str,
 
 
 def generate_aa_report(rcp_client: RCPClientWrapper, db: AADatabase,
-                      run_id: int, limit: Optional[int] = None) -> int:
+                      run_id: int, all_mc: List[Dict[str, Any]]) -> int:
     logger.info("Starting report generation")
-    all_mc = rcp_client.get_all_multi_clusters()
-    all_mc = [mc for mc in all_mc if mc['multi_cluster_uid'] not in Config.EXCLUDE_UIDS]
-
-    if limit is not None and limit > 0:
-        all_mc = all_mc[:limit]
-        logger.info(f"Limited to {limit} clusters")
-
     total_clusters = len(all_mc)
     logger.info(f"Processing {total_clusters} clusters")
     rate_limiter = RateLimiter(calls_per_second=Config.API_CALLS_PER_SECOND)
 
+    already_processed = db.get_processed_mc_uids(run_id)
     processed_count = 0
-    for idx, mc in enumerate(all_mc, 1):
-        mc_uid = mc['multi_cluster_uid']
-        logger.info(f"{idx}/{total_clusters}: {mc_uid}")
-        result = handle_aa_cluster(rcp_client, mc_uid, db, run_id, rate_limiter)
-        if result:
-            processed_count += 1
+
+    if Config.ENABLE_PARALLEL:
+        # Workers hand their writes to a single BackgroundWriter thread that commits
+        # them in batches. RateLimiter paces API calls across all workers.
+        pending = []
+        for mc in all_mc:
+            mc_uid = mc['multi_cluster_uid']
+            if mc_uid in already_processed:
+                logger.info(f"{mc_uid} already processed, skipping")
+            else:
+                pending.append(mc_uid)
+        logger.info(f"Processing {len(pending)} clusters with {Config.MAX_WORKERS} workers")
+        with BackgroundWriter(db) as writer, ThreadPoolExecutor(max_workers=Config.MAX_WORKERS) as executor:
+            futures = {executor.submit(handle_aa_cluster, rcp_client, mc_uid, writer, run_id, rate_limiter): mc_uid
+                       for mc_uid in pending}
+            for idx, future in enumerate(as_completed(futures), 1):
+                logger.info(f"{idx}/{len(futures)}: {futures[future]} done")
+                if future.result():
+                    processed_count += 1
+        flush_logs()
+        logger.info(f"Completed: {processed_count}/{total_clusters}")
+        return processed_count
+
+    pending = PendingWrites(db)
+    for start in range(0, total_clusters, Config.DB_BATCH_SIZE):
+        # RCP calls for a batch run first; their writes then commit in one short
+        # transaction every DB_BATCH_SIZE clusters instead of once per cluster
+        for idx, mc in enumerate(all_mc[start:start + Config.DB_BATCH_SIZE], start + 1):
+            mc_uid = mc['multi_cluster_uid']
+            logger.info(f"{idx}/{total_clusters}: {mc_uid}")
+            if mc_uid in already_processed:
+                logger.info(f"{mc_uid} already processed, skipping")
+                continue
+            handle_aa_cluster(rcp_client, mc_uid, pending, run_id, rate_limiter)
+        processed_count += pending.commit(run_id)
+        flush_logs()
 
     logger.info(f"Completed: {processed_count}/{total_clusters}")
     return processed_count
@@ -573,16 +688,15 @@ def run_report_generation(limit: Optional[int] = None) -> None:
 
     try:
         rcp_client = RCPClientWrapper(Config.RCP_SERVER, Config.RCP_USERNAME, Config.RCP_PASSWORD)
-        all_mc = rcp_client.get_all_multi_clusters()
-        all_mc = [mc for mc in all_mc if mc['multi_cluster_uid'] not in Config.EXCLUDE_UIDS]
+        all_mc = rcp_client.get_all_multi_clusters(limit=limit)
         if limit is not None and limit > 0:
-            all_mc = all_mc[:limit]
+            logger.info(f"Limited to {limit} clusters")
         total_clusters = len(all_mc)
 
         run_id = db.create_run(f"run_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}", total_clusters)
         logger.info(f"Run ID: {run_id}")
 
-        processed_count = generate_aa_report(rcp_client, db, run_id, limit=limit)
+        processed_count = generate_aa_report(rcp_client, db, run_id, all_mc)
         db.complete_run(run_id, None)
 
         # Force WAL checkpoint to ensure all data is written to main DB file
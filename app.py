@@ -14,10 +14,14 @@ Then open browser at: http://localhost:5000
 import os
 import sys
 import json
+import hashlib
 import logging
 import re
-from functools import wraps
-from flask import Flask, render_template, jsonify, request, send_file
+import threading
+import time
+from datetime import date, datetime
+from functools import lru_cache, wraps
+from flask import Flask, Response, render_template, jsonify, request, send_file, make_response
 from pathlib import Path
 
 # Load environment variables from .env file (if python-dotenv is installed)
@@ -31,6 +35,12 @@ except ImportError:
     print("[INFO] python-dotenv not installed. Using system environment variables only.")
     print("       Install with: pip install python-dotenv")
 
+# orjson parses infra_json several times faster; fall back to the stdlib json module
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
 # Import database module
 from aa_database import AADatabase
 
@@ -53,6 +63,15 @@ app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
 # RCP blueprint values are multiplied by this factor for display
 ADJUSTMENT_FACTOR = 0.6  # 40% reduction (shows 60% of original)
 
+# Seconds a looked-up latest completed run ID is reused before querying again
+LATEST_RUN_ID_TTL = 5.0
+
+# Dashboard template contexts kept in memory (one per latest/max run ID and day)
+DASHBOARD_CACHE_SIZE = 8
+
+# Chart API responses kept in memory (keyed by URL and database state)
+API_CACHE_SIZE = 256
+
 # Database Path Configuration
 # For Cloud Run: uses GCS mounted volume
 # For local dev: uses current directory
@@ -122,6 +141,15 @@ def format_currency_filter(value, decimals=2):
     format_str = "{:,.%df}" % decimals
     return "$" + format_str.format(value)
 
+@app.template_filter('age_display')
+def age_display_filter(days_old):
+    """Format a cluster age in days ('N/A', 'N days' or 'N.N years')."""
+    if days_old is None:
+        return 'N/A'
+    if days_old >= 365:
+        return f"{days_old / 365:.1f} years"
+    return f"{days_old} days"
+
 
 # ============================================================================
 # CONTEXT PROCESSORS
@@ -140,14 +168,38 @@ def inject_path_prefix():
 # HELPER FUNCTIONS
 # ============================================================================
 
+_db = None
+_db_lock = threading.Lock()
+
+
+def get_db():
+    """Process-wide AADatabase; each request thread reuses its own connection."""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = AADatabase(DB_PATH)
+    return _db
+
+
+# (run_id, monotonic time it was looked up)
+_latest_run_id_cache = (None, float('-inf'))
+
+
 def get_latest_run_id():
-    """Get the latest completed run ID from database."""
+    """Get the latest completed run ID from database (cached for LATEST_RUN_ID_TTL seconds)."""
+    global _latest_run_id_cache
+    run_id, looked_up = _latest_run_id_cache
+    now = time.monotonic()
+    if now - looked_up < LATEST_RUN_ID_TTL:
+        return run_id
     try:
-        with AADatabase(DB_PATH) as db:
-            latest = db.conn.execute(
-                'SELECT run_id FROM runs WHERE status = "completed" ORDER BY run_timestamp DESC LIMIT 1'
-            ).fetchone()
-            return latest['run_id'] if latest else None
+        latest = get_db().conn.execute(
+            'SELECT run_id FROM runs WHERE status = "completed" ORDER BY run_timestamp DESC LIMIT 1'
+        ).fetchone()
+        run_id = latest['run_id'] if latest else None
+        _latest_run_id_cache = (run_id, now)
+        return run_id
     except Exception as e:
         logger.error(f"Error getting latest run ID: {e}")
         return None
@@ -160,12 +212,77 @@ def get_run_id_or_latest(run_id=None):
     return get_latest_run_id()
 
 
+# Allow alphanumeric, hyphens, underscores
+_MC_UID_RE = re.compile(r'^[a-zA-Z0-9_-]+$')
+
+
+# (data stamp, monotonic time it was looked up)
+_data_stamp_cache = (None, float('-inf'))
+
+
+def get_data_stamp():
+    """Short string that changes whenever runs, results or metadata are written (cached like get_latest_run_id)."""
+    global _data_stamp_cache
+    stamp, looked_up = _data_stamp_cache
+    now = time.monotonic()
+    if now - looked_up < LATEST_RUN_ID_TTL:
+        return stamp
+    # New rows move the MAX() ids; upserts of existing results (re-saved or resumed
+    # clusters) and metadata refreshes keep their ids but bump the timestamps
+    row = get_db().conn.execute('''
+        SELECT (SELECT MAX(run_id) FROM runs),
+               (SELECT COUNT(*) FROM runs WHERE status = 'completed'),
+               (SELECT MAX(result_id) FROM cluster_results),
+               (SELECT MAX(processed_at) FROM cluster_results),
+               (SELECT MAX(last_updated) FROM cluster_metadata)
+    ''').fetchone()
+    stamp = ':'.join(str(value) for value in row)
+    _data_stamp_cache = (stamp, now)
+    return stamp
+
+
+# ETag -> (body, mimetype); insertion ordered, oldest evicted first
+_api_cache = {}
+_api_cache_lock = threading.Lock()
+
+
+def cached_api(func):
+    """Decorator for read-only JSON endpoints: ETag/304 support plus an in-memory response cache.
+
+    The ETag hashes the full request URL with get_data_stamp(), so any new run or
+    result invalidates it; only 200 responses are cached.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        etag = hashlib.md5(f"{request.full_path}|{get_data_stamp()}".encode()).hexdigest()
+        if request.if_none_match and etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            with _api_cache_lock:
+                cached = _api_cache.get(etag)
+            if cached is not None:
+                body, mimetype = cached
+                response = Response(body, mimetype=mimetype)
+            else:
+                response = make_response(func(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                with _api_cache_lock:
+                    if len(_api_cache) >= API_CACHE_SIZE:
+                        _api_cache.pop(next(iter(_api_cache)))
+                    _api_cache[etag] = (response.get_data(), response.mimetype)
+        response.set_etag(etag)
+        # Browsers revalidate every time, which is a 304 while the data is unchanged
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
+
+
 def validate_mc_uid(mc_uid):
     """Validate cluster UID format."""
     if not mc_uid or not isinstance(mc_uid, str):
         return False
-    # Allow alphanumeric, hyphens, underscores
-    return bool(re.match(r'^[a-zA-Z0-9_-]+$', mc_uid))
+    return bool(_MC_UID_RE.match(mc_uid))
 
 
 def validate_run_id(run_id):
@@ -198,338 +315,193 @@ def handle_api_error(func):
 @handle_api_error
 def dashboard():
     """Main dashboard page."""
-    # Use context manager to prevent connection leak
-    with AADatabase(DB_PATH) as db:
-        # Get latest run
-        latest_run = db.conn.execute('''
-            SELECT * FROM runs
-            WHERE status = 'completed'
-            ORDER BY run_timestamp DESC
-            LIMIT 1
-        ''').fetchone()
-
-        if not latest_run:
-            return render_template('dashboard.html',
-                                 latest_run=None,
-                                 stats=None,
-                                 metrics=None,
-                                 top_savings=[],
-                                 trend=[])
-
-        run_id = latest_run['run_id']
-
-        # Get statistics
-        stats = {
-            'run_id': run_id,
-            'timestamp': latest_run['run_timestamp'],
-            'jira_ticket': latest_run['jira_ticket'],
-            'total_clusters': latest_run['total_clusters'],
-            'processed': latest_run['processed_clusters'],
-            'failed': latest_run['failed_clusters'],
-        }
-
-        # Calculate comprehensive metrics (ONLY for clusters with positive savings)
-        # Note: We use subqueries for total_savings and avg_savings to avoid duplication from JOIN
-        metrics_data = db.conn.execute('''
-            SELECT
-                (SELECT SUM(total_savings) FROM cluster_results
-                 WHERE run_id = ? AND status = 'success' AND total_savings > 0) as total_savings,
-                SUM(CASE WHEN cs.cluster_type = 'current' THEN cs.total_price ELSE 0 END) as total_current,
-                SUM(CASE WHEN cs.cluster_type = 'optimal' THEN cs.total_price ELSE 0 END) as total_optimal,
-                (SELECT AVG(total_savings) FROM cluster_results
-                 WHERE run_id = ? AND status = 'success' AND total_savings > 0) as avg_savings,
-                COUNT(DISTINCT cr.mc_uid) as optimizable_clusters,
-                COUNT(DISTINCT CASE WHEN cr.total_savings > 2000 THEN cr.mc_uid END) as high_impact_clusters
-            FROM cluster_results cr
-            JOIN cluster_singles cs ON cr.result_id = cs.result_id
-            WHERE cr.run_id = ? AND cr.status = 'success' AND cr.total_savings > 0
-        ''', (run_id, run_id, run_id)).fetchone()
-
-        total_savings = metrics_data['total_savings'] or 0
-        total_current = metrics_data['total_current'] or 0
-        total_optimal = metrics_data['total_optimal'] or 0
-        avg_savings = metrics_data['avg_savings'] or 0
-        optimizable_clusters = metrics_data['optimizable_clusters'] or 0
-        high_impact_clusters = metrics_data['high_impact_clusters'] or 0
-
-        # Calculate median savings (only for positive savings)
-        median_savings_row = db.conn.execute('''
-            SELECT total_savings
-            FROM cluster_results
-            WHERE run_id = ? AND status = 'success' AND total_savings > 0
-            ORDER BY total_savings
-            LIMIT 1 OFFSET (
-                SELECT COUNT(*) / 2
-                FROM cluster_results
-                WHERE run_id = ? AND status = 'success' AND total_savings > 0
-            )
-        ''', (run_id, run_id)).fetchone()
-        median_savings = median_savings_row['total_savings'] if median_savings_row else 0
-
-        # Get previous run for comparison (only positive savings)
-        previous_run = db.conn.execute('''
-            SELECT run_id,
-                   (SELECT SUM(total_savings)
-                    FROM cluster_results
-                    WHERE run_id = runs.run_id AND status = 'success' AND total_savings > 0) as total_savings
-            FROM runs
-            WHERE status = 'completed' AND run_id < ?
-            ORDER BY run_timestamp DESC
-            LIMIT 1
-        ''', (run_id,)).fetchone()
-
-        # Calculate savings change percentage
-        savings_change_percent = 0
-        if previous_run and previous_run['total_savings']:
-            prev_savings = previous_run['total_savings']
-            savings_change_percent = ((total_savings - prev_savings) / prev_savings) * 100
-
-        # Calculate optimization rate
-        optimization_rate = (optimizable_clusters / stats['total_clusters'] * 100) if stats['total_clusters'] > 0 else 0
-
-        # Calculate instance vs storage savings breakdown (only positive savings)
-        storage_savings_row = db.conn.execute('''
-            SELECT
-                SUM(CASE WHEN cs.cluster_type = 'current' THEN cs.storage_price ELSE 0 END) -
-                SUM(CASE WHEN cs.cluster_type = 'optimal' THEN cs.storage_price ELSE 0 END) as storage_savings
-            FROM cluster_results cr
-            JOIN cluster_singles cs ON cr.result_id = cs.result_id
-            WHERE cr.run_id = ? AND cr.status = 'success' AND cr.total_savings > 0
-        ''', (run_id,)).fetchone()
-        storage_savings = storage_savings_row['storage_savings'] or 0
-
-        # Calculate efficiency (how much is over-provisioned)
-        efficiency_percent = (total_optimal / total_current * 100) if total_current > 0 else 100
-        over_provisioned_percent = 100 - efficiency_percent
-
-        # Build metrics dictionary
-        metrics = {
-            # Row 1: Financial Metrics
-            'monthly_savings': round(total_savings * 0.6, 2),  # 40% reduction (60% of original)
-            'monthly_savings_rcp_blueprint': round(total_savings, 2),  # Original RCP blueprint value
-            'savings_change_percent': round(savings_change_percent, 1),
-            'annual_roi': round(total_savings * 12 * 0.6, 2),  # 40% reduction (60% of original)
-            'annual_roi_rcp_blueprint': round(total_savings * 12, 2),  # Original RCP blueprint value
-            'savings_percent_of_spend': round((total_savings / total_current * 100) if total_current > 0 else 0, 1),
-            'avg_savings_per_cluster': round(avg_savings, 2),
-            'median_savings': round(median_savings, 2),
-            'optimization_rate': round(optimization_rate, 1),
-            'optimizable_clusters': optimizable_clusters,
-            'total_clusters': stats['total_clusters'],
-
-            # Row 2: Operational Metrics
-            'high_impact_clusters': high_impact_clusters,
-            'instance_efficiency': round(efficiency_percent, 1),
-            'over_provisioned_percent': round(over_provisioned_percent, 1),
-            'storage_savings': round(storage_savings, 2),
-            'storage_savings_percent': round((storage_savings / total_savings * 100) if total_savings > 0 else 0, 1),
-        }
-
-        # Calculate Clusters Needing Attention (>$1K savings OR >30% cost reduction)
-        attention_result = db.conn.execute("""
-            SELECT COUNT(DISTINCT cr.mc_uid) as attention_count
-            FROM cluster_results cr
-            LEFT JOIN cluster_singles cs ON cr.result_id = cs.result_id AND cs.cluster_type = 'current'
-            WHERE cr.run_id = ?
-            AND cr.status = 'success'
-            AND (
-                cr.total_savings > 1000
-                OR (cs.total_price > 0 AND (cr.total_savings / cs.total_price * 100) > 30)
-            )
-        """, (run_id,)).fetchone()
-        metrics['clusters_needing_attention'] = attention_result['attention_count'] if attention_result else 0
+    # The page only changes when a run is created or completed (and daily, for
+    # cluster ages), so the template context is cached under that key
+    latest_run_id, max_run_id = get_db().conn.execute('''
+        SELECT (SELECT run_id FROM runs WHERE status = 'completed' ORDER BY run_timestamp DESC LIMIT 1),
+               (SELECT MAX(run_id) FROM runs)
+    ''').fetchone()
+    context = _build_dashboard_context(latest_run_id, max_run_id, date.today())
+    return render_template('dashboard.html', **context)
+
+
+@lru_cache(maxsize=DASHBOARD_CACHE_SIZE)
+def _build_dashboard_context(latest_run_id, max_run_id, today):
+    """Dashboard template context for the latest completed run.
+
+    max_run_id and today are part of the cache key only: a new run changes the
+    run history, and cluster ages change daily.
+    """
+    if latest_run_id is None:
+        return dict(latest_run=None,
+                    stats=None,
+                    metrics=None,
+                    top_savings=[],
+                    trend=[])
+
+    # Shared instance: reuses this thread's open connection and its page cache
+    db = get_db()
+    latest_run = db.conn.execute('SELECT * FROM runs WHERE run_id = ?', (latest_run_id,)).fetchone()
+    run_id = latest_run['run_id']
+
+    # Get statistics
+    stats = {
+        'run_id': run_id,
+        'timestamp': latest_run['run_timestamp'],
+        'jira_ticket': latest_run['jira_ticket'],
+        'total_clusters': latest_run['total_clusters'],
+        'processed': latest_run['processed_clusters'],
+        'failed': latest_run['failed_clusters'],
+    }
 
-        # Calculate most used instance type
-        instance_counts = {}
-        cluster_counts = {}  # Track how many clusters use each instance type
+    # Pre-aggregated metrics (ONLY clusters with positive savings), stored when the run completed
+    summary = db.get_run_summary(run_id)
 
-        results = db.conn.execute('''
-            SELECT cs.infra_json
-            FROM cluster_results cr
-            JOIN cluster_singles cs ON cr.result_id = cs.result_id
-            WHERE cr.run_id = ? AND cr.status = 'success' AND cs.cluster_type = 'current'
-        ''', (run_id,)).fetchall()
-
-        for row in results:
-            infra = json.loads(row['infra_json'])
-            for instance_type, count in infra.items():
-                instance_counts[instance_type] = instance_counts.get(instance_type, 0) + count
-                cluster_counts[instance_type] = cluster_counts.get(instance_type, 0) + 1
-
-        if instance_counts:
-            most_used_instance = max(instance_counts, key=instance_counts.get)
-            most_used_count = cluster_counts[most_used_instance]
-
-            # Calculate average cost for clusters using this instance type
-            avg_cost_row = db.conn.execute('''
-                SELECT AVG(cs.total_price) as avg_cost
-                FROM cluster_results cr
-                JOIN cluster_singles cs ON cr.result_id = cs.result_id
-                WHERE cr.run_id = ? AND cs.cluster_type = 'current'
-                AND cs.infra_json LIKE ?
-            ''', (run_id, f'%"{most_used_instance}"%')).fetchone()
+    total_savings = summary['total_savings'] or 0
+    total_current = summary['total_current'] or 0
+    avg_savings = summary['avg_savings'] or 0
+    optimizable_clusters = summary['optimizable_clusters'] or 0
+    high_impact_clusters = summary['high_impact_clusters'] or 0
+    median_savings = summary['median_savings'] or 0
 
-            most_used_avg_cost = avg_cost_row['avg_cost'] or 0
-        else:
-            most_used_instance = 'N/A'
-            most_used_count = 0
-            most_used_avg_cost = 0
-
-        metrics['most_used_instance'] = most_used_instance
-        metrics['most_used_instance_count'] = most_used_count
-        metrics['most_used_instance_avg_cost'] = round(most_used_avg_cost, 2)
+    # Get previous run for comparison (only positive savings)
+    previous_run = db.conn.execute('''
+        SELECT run_id,
+               (SELECT SUM(total_savings)
+                FROM cluster_results
+                WHERE run_id = runs.run_id AND status = 'success' AND total_savings > 0) as total_savings
+        FROM runs
+        WHERE status = 'completed' AND run_id < ?
+        ORDER BY run_timestamp DESC
+        LIMIT 1
+    ''', (run_id,)).fetchone()
 
-        # 🆕 NEW METRICS: Total AA Spend
-        metrics['total_aa_spend'] = round(total_current * 0.6, 2)  # 40% reduction (60% of original)
-        metrics['total_aa_spend_rcp_blueprint'] = round(total_current, 2)  # Original RCP blueprint value
+    # Calculate savings change percentage
+    savings_change_percent = 0
+    if previous_run and previous_run['total_savings']:
+        prev_savings = previous_run['total_savings']
+        savings_change_percent = ((total_savings - prev_savings) / prev_savings) * 100
+
+    # Calculate optimization rate
+    optimization_rate = (optimizable_clusters / stats['total_clusters'] * 100) if stats['total_clusters'] > 0 else 0
+
+    # Instance vs storage savings breakdown (only positive savings)
+    storage_savings = summary['storage_savings'] or 0
+
+    # Build metrics dictionary
+    metrics = {
+        # Row 1: Financial Metrics
+        'monthly_savings': round(total_savings * 0.6, 2),  # 40% reduction (60% of original)
+        'monthly_savings_rcp_blueprint': round(total_savings, 2),  # Original RCP blueprint value
+        'savings_change_percent': round(savings_change_percent, 1),
+        'annual_roi': round(total_savings * 12 * 0.6, 2),  # 40% reduction (60% of original)
+        'annual_roi_rcp_blueprint': round(total_savings * 12, 2),  # Original RCP blueprint value
+        'savings_percent_of_spend': round(summary['savings_percent_of_spend'], 1),
+        'avg_savings_per_cluster': round(avg_savings, 2),
+        'median_savings': round(median_savings, 2),
+        'optimization_rate': round(optimization_rate, 1),
+        'optimizable_clusters': optimizable_clusters,
+        'total_clusters': stats['total_clusters'],
+
+        # Row 2: Operational Metrics
+        'high_impact_clusters': high_impact_clusters,
+        'instance_efficiency': round(summary['efficiency_percent'], 1),
+        'over_provisioned_percent': round(summary['over_provisioned_percent'], 1),
+        'storage_savings': round(storage_savings, 2),
+        'storage_savings_percent': round(summary['storage_savings_percent'], 1),
+    }
 
-        # 🆕 NEW METRICS: Average Cluster Age
-        age_data = db.conn.execute('''
-            SELECT cm.creation_date
+    # Clusters Needing Attention (>$1K savings OR >30% cost reduction)
+    metrics['clusters_needing_attention'] = summary['attention_count'] or 0
+
+    # Most used instance type
+    metrics['most_used_instance'] = summary['most_used_instance'] or 'N/A'
+    metrics['most_used_instance_count'] = summary['most_used_instance_count'] or 0
+    metrics['most_used_instance_avg_cost'] = round(summary['most_used_instance_avg_cost'] or 0, 2)
+
+    # 🆕 NEW METRICS: Total AA Spend
+    metrics['total_aa_spend'] = round(total_current * 0.6, 2)  # 40% reduction (60% of original)
+    metrics['total_aa_spend_rcp_blueprint'] = round(total_current, 2)  # Original RCP blueprint value
+
+    # 🆕 NEW METRICS: Average Cluster Age
+    # Ages are computed by SQLite's julianday() in one aggregate instead of
+    # parsing every creation_date in Python; unparseable dates yield NULL and are skipped
+    age_row = db.conn.execute('''
+        SELECT AVG(age_days) AS avg_age_days, MAX(age_days) AS oldest_days
+        FROM (
+            SELECT CAST(julianday('now', 'localtime') - julianday(cm.creation_date) AS INTEGER) AS age_days
             FROM cluster_results cr
-            LEFT JOIN cluster_metadata cm ON cr.mc_uid = cm.mc_uid
+            JOIN cluster_metadata cm ON cr.mc_uid = cm.mc_uid
             WHERE cr.run_id = ? AND cr.status = 'success' AND cm.creation_date IS NOT NULL
-        ''', (run_id,)).fetchall()
+        )
+    ''', (run_id,)).fetchone()
 
-        if age_data:
-            from datetime import datetime
-            current_date = datetime.now()
-            ages_in_days = []
-
-            for row in age_data:
-                try:
-                    creation_date = datetime.fromisoformat(row['creation_date'].replace('Z', '+00:00'))
-                    days_old = (current_date - creation_date).days
-                    ages_in_days.append(days_old)
-                except (ValueError, AttributeError):
-                    pass
-
-            if ages_in_days:
-                avg_age_days = sum(ages_in_days) / len(ages_in_days)
-                metrics['avg_cluster_age_days'] = round(avg_age_days, 0)
-
-                # Format display
-                if avg_age_days >= 365:
-                    metrics['avg_cluster_age_display'] = f"{avg_age_days / 365:.1f} years"
-                elif avg_age_days >= 30:
-                    metrics['avg_cluster_age_display'] = f"{avg_age_days / 30:.0f} months"
-                else:
-                    metrics['avg_cluster_age_display'] = f"{avg_age_days:.0f} days"
-
-                # Oldest cluster
-                metrics['oldest_cluster_days'] = max(ages_in_days)
-            else:
-                metrics['avg_cluster_age_days'] = 0
-                metrics['avg_cluster_age_display'] = 'N/A'
-                metrics['oldest_cluster_days'] = 0
-        else:
-            metrics['avg_cluster_age_days'] = 0
-            metrics['avg_cluster_age_display'] = 'N/A'
-            metrics['oldest_cluster_days'] = 0
+    if age_row['avg_age_days'] is not None:
+        avg_age_days = age_row['avg_age_days']
+        metrics['avg_cluster_age_days'] = round(avg_age_days, 0)
 
-        # Note: Top Cloud Provider metrics are calculated below in the provider_stats section
+        # Format display
+        if avg_age_days >= 365:
+            metrics['avg_cluster_age_display'] = f"{avg_age_days / 365:.1f} years"
+        elif avg_age_days >= 30:
+            metrics['avg_cluster_age_display'] = f"{avg_age_days / 30:.0f} months"
+        else:
+            metrics['avg_cluster_age_display'] = f"{avg_age_days:.0f} days"
+
+        # Oldest cluster
+        metrics['oldest_cluster_days'] = age_row['oldest_days']
+    else:
+        metrics['avg_cluster_age_days'] = 0
+        metrics['avg_cluster_age_display'] = 'N/A'
+        metrics['oldest_cluster_days'] = 0
+
+    # Top 2 cloud providers by cluster count
+    top_providers = []
+    total_clusters_with_provider = summary['provider_cluster_count'] or 0
+
+    for prefix in ('top_provider', 'second_provider'):
+        if summary[prefix]:
+            count = summary[f'{prefix}_count']
+            percentage = (count / total_clusters_with_provider * 100) if total_clusters_with_provider > 0 else 0
+            top_providers.append({
+                'name': summary[prefix],
+                'count': count,
+                'cost': round(summary[f'{prefix}_cost'], 2),
+                'percentage': round(percentage, 0)
+            })
 
-        # Calculate clusters by cloud provider
-        provider_stats = db.conn.execute('''
-            SELECT
-                cm.cloud_provider,
-                COUNT(DISTINCT cr.mc_uid) as cluster_count,
-                SUM(CASE WHEN cs.cluster_type = 'current' THEN cs.total_price ELSE 0 END) as total_cost
-            FROM cluster_results cr
-            JOIN cluster_singles cs ON cr.result_id = cs.result_id
-            LEFT JOIN cluster_metadata cm ON cr.mc_uid = cm.mc_uid
-            WHERE cr.run_id = ? AND cr.status = 'success'
-            GROUP BY cm.cloud_provider
-            ORDER BY cluster_count DESC
-        ''', (run_id,)).fetchall()
-
-        # Get top 2 providers
-        top_providers = []
-        total_clusters_with_provider = sum(p['cluster_count'] for p in provider_stats if p['cloud_provider'])
-
-        for provider in provider_stats[:2]:
-            if provider['cloud_provider']:
-                percentage = (provider['cluster_count'] / total_clusters_with_provider * 100) if total_clusters_with_provider > 0 else 0
-                top_providers.append({
-                    'name': provider['cloud_provider'],
-                    'count': provider['cluster_count'],
-                    'cost': round(provider['total_cost'], 2),
-                    'percentage': round(percentage, 0)
-                })
+    metrics['top_providers'] = top_providers
 
-        metrics['top_providers'] = top_providers
-
-        # Calculate top cloud provider for Financial Metrics
-        if provider_stats and provider_stats[0]['cloud_provider']:
-            top_provider = provider_stats[0]
-            metrics['top_cloud_provider'] = top_provider['cloud_provider']
-            metrics['top_cloud_provider_cost'] = round(top_provider['total_cost'], 2)
-            metrics['top_cloud_provider_count'] = top_provider['cluster_count']
-            metrics['top_cloud_provider_percentage'] = round(
-                (top_provider['cluster_count'] / total_clusters_with_provider * 100) if total_clusters_with_provider > 0 else 0,
-                0
-            )
-        else:
-            metrics['top_cloud_provider'] = 'N/A'
-            metrics['top_cloud_provider_cost'] = 0
-            metrics['top_cloud_provider_count'] = 0
-            metrics['top_cloud_provider_percentage'] = 0
-
-        stats['total_savings'] = round(total_savings, 2)
-
-        # Get top 10 savings
-        top_savings = db.get_top_savings_opportunities(run_id=run_id, limit=10)
-
-        # Add cluster age calculation to each cluster
-        from datetime import datetime
-        current_date = datetime.now()
-        for cluster in top_savings:
-            if cluster.get('creation_date'):
-                try:
-                    creation_date = datetime.fromisoformat(cluster['creation_date'].replace('Z', '+00:00'))
-                    days_old = (current_date - creation_date).days
-                    cluster['age_days'] = days_old
-                    if days_old >= 365:
-                        cluster['age_display'] = f"{days_old / 365:.1f} years"
-                    else:
-                        cluster['age_display'] = f"{days_old} days"
-                except (ValueError, AttributeError):
-                    cluster['age_days'] = None
-                    cluster['age_display'] = 'N/A'
-            else:
-                cluster['age_days'] = None
-                cluster['age_display'] = 'N/A'
+    # Calculate top cloud provider for Financial Metrics
+    if summary['top_provider']:
+        metrics['top_cloud_provider'] = summary['top_provider']
+        metrics['top_cloud_provider_cost'] = round(summary['top_provider_cost'], 2)
+        metrics['top_cloud_provider_count'] = summary['top_provider_count']
+        metrics['top_cloud_provider_percentage'] = round(
+            (summary['top_provider_count'] / total_clusters_with_provider * 100) if total_clusters_with_provider > 0 else 0,
+            0
+        )
+    else:
+        metrics['top_cloud_provider'] = 'N/A'
+        metrics['top_cloud_provider_cost'] = 0
+        metrics['top_cloud_provider_count'] = 0
+        metrics['top_cloud_provider_percentage'] = 0
 
-        # Get savings trend (last 10 runs)
-        trend = db.get_total_savings_trend(limit=10)
-        trend.reverse()  # Oldest to newest for chart
+    stats['total_savings'] = round(total_savings, 2)
 
-        # Get recent runs history (last 10 runs)
-        runs_history = db.conn.execute('''
-            SELECT
-                run_id,
-                run_timestamp,
-                jira_ticket,
-                total_clusters,
-                processed_clusters,
-                failed_clusters,
-                status,
-                completed_at
-            FROM runs
-            ORDER BY run_timestamp DESC
-            LIMIT 10
-        ''').fetchall()
+    # Get top 10 savings
+    top_savings = db.get_top_savings_opportunities(run_id=run_id, limit=10)
 
-        runs = [dict(row) for row in runs_history]
+    # Savings trend and recent runs history (last 10 runs each), one query
+    trend, runs = db.get_runs_overview(limit=10)
+    trend.reverse()  # Oldest to newest for chart
 
-        # No need for db.close() - context manager handles it
-        return render_template('dashboard.html',
-                             latest_run=latest_run,
-                             stats=stats,
-                             metrics=metrics,
-                             top_savings=top_savings,
-                             trend=trend,
-                             runs=runs)
+    return dict(latest_run=latest_run,
+                stats=stats,
+                metrics=metrics,
+                top_savings=top_savings,
+                trend=trend,
+                runs=runs)
 
 
 
@@ -543,246 +515,189 @@ def cluster_details(mc_uid):
         logger.warning(f"Invalid mc_uid format: {mc_uid}")
         return "Invalid cluster ID format", 400
 
-    # Use context manager
-    with AADatabase(DB_PATH) as db:
-        # Get latest result for this cluster
-        latest_result = db.conn.execute('''
-            SELECT cr.*, r.run_timestamp, r.jira_ticket
-            FROM cluster_results cr
-            JOIN runs r ON cr.run_id = r.run_id
-            WHERE cr.mc_uid = ? AND cr.status = 'success'
-            ORDER BY r.run_timestamp DESC
-            LIMIT 1
-        ''', (mc_uid,)).fetchone()
-
-        if not latest_result:
-            return "Cluster not found", 404
-
-        result_id = latest_result['result_id']
-
-        # Get current and optimal configurations
-        singles = db.conn.execute('''
-            SELECT * FROM cluster_singles
-            WHERE result_id = ?
-            ORDER BY cluster_type DESC
-        ''', (result_id,)).fetchall()
-
-        current_clusters = []
-        optimal_clusters = []
-
-        # Remove import from loop
-        for single in singles:
-            cluster_data = {
-                'uid': single['cluster_uid'],
-                'infra': json.loads(single['infra_json']),
-                'instance_price': single['instance_price'],
-                'storage_price': single['storage_price'],
-                'total_price': single['total_price'],
-                'total_instances': single['total_instances']
-            }
-
-            if single['cluster_type'] == 'current':
-                current_clusters.append(cluster_data)
+    db = get_db()
+    # Get latest result for this cluster
+    latest_result = db.conn.execute('''
+        SELECT cr.*, r.run_timestamp, r.jira_ticket
+        FROM cluster_results cr
+        JOIN runs r ON cr.run_id = r.run_id
+        WHERE cr.mc_uid = ? AND cr.status = 'success'
+        ORDER BY r.run_timestamp DESC
+        LIMIT 1
+    ''', (mc_uid,)).fetchone()
+
+    if not latest_result:
+        return "Cluster not found", 404
+
+    result_id = latest_result['result_id']
+
+    # Get current and optimal configurations
+    singles = db.conn.execute('''
+        SELECT single_id, cluster_uid, cluster_type, instance_price, storage_price,
+               total_price, total_instances
+        FROM cluster_singles
+        WHERE result_id = ?
+        ORDER BY cluster_type DESC
+    ''', (result_id,)).fetchall()
+
+    # Instance type counts from the normalized infra table (no infra_json parsing),
+    # in infra_json key order
+    infra_by_single = {}
+    for row in db.conn.execute('''
+        SELECT csi.single_id, csi.instance_type, csi.instance_count
+        FROM cluster_singles cs
+        JOIN cluster_singles_infra csi ON csi.single_id = cs.single_id
+        WHERE cs.result_id = ?
+        ORDER BY csi.single_id, csi.position
+    ''', (result_id,)):
+        infra_by_single.setdefault(row['single_id'], {})[row['instance_type']] = row['instance_count']
+
+    current_clusters = []
+    optimal_clusters = []
+    # Per-side totals, accumulated in the same pass: [instances, storage price, instance price]
+    current_totals = [0, 0, 0]
+    optimal_totals = [0, 0, 0]
+
+    for single in singles:
+        cluster_data = {
+            'uid': single['cluster_uid'],
+            'infra': infra_by_single.get(single['single_id'], {}),
+            'instance_price': single['instance_price'],
+            'storage_price': single['storage_price'],
+            'total_price': single['total_price'],
+            'total_instances': single['total_instances']
+        }
+
+        if single['cluster_type'] == 'current':
+            clusters, totals = current_clusters, current_totals
+        else:
+            clusters, totals = optimal_clusters, optimal_totals
+        clusters.append(cluster_data)
+        totals[0] += single['total_instances']
+        totals[1] += single['storage_price']
+        totals[2] += single['instance_price']
+
+    # Get history
+    history = db.get_cluster_history(mc_uid, limit=10)
+    history.reverse()  # Oldest to newest for chart
+
+    # Get metadata
+    metadata = db.conn.execute('''
+        SELECT * FROM cluster_metadata
+        WHERE mc_uid = ?
+    ''', (mc_uid,)).fetchone()
+
+    # Calculate additional metrics
+    total_current_instances, current_storage, current_instance = current_totals
+    total_optimal_instances, optimal_storage, optimal_instance = optimal_totals
+    storage_savings = current_storage - optimal_storage
+    instance_savings = current_instance - optimal_instance
+
+    # Add cluster age calculation to metadata
+    metadata_dict = dict(metadata) if metadata else None
+    if metadata_dict and metadata_dict.get('creation_date'):
+        try:
+            creation_date = datetime.fromisoformat(metadata_dict['creation_date'].replace('Z', '+00:00'))
+            current_date = datetime.now()
+            days_old = (current_date - creation_date).days
+            metadata_dict['age_days'] = days_old
+            if days_old >= 365:
+                metadata_dict['age_display'] = f"{days_old / 365:.1f} years"
             else:
-                optimal_clusters.append(cluster_data)
-
-        # Get history
-        history = db.get_cluster_history(mc_uid, limit=10)
-        history.reverse()  # Oldest to newest for chart
-
-        # Get metadata
-        metadata = db.conn.execute('''
-            SELECT * FROM cluster_metadata
-            WHERE mc_uid = ?
-        ''', (mc_uid,)).fetchone()
-
-        # Calculate additional metrics
-        total_current_instances = sum(c['total_instances'] for c in current_clusters)
-        total_optimal_instances = sum(c['total_instances'] for c in optimal_clusters)
-
-        # Calculate storage savings
-        storage_savings = sum(c['storage_price'] for c in current_clusters) - \
-                         sum(c['storage_price'] for c in optimal_clusters)
-
-        # Calculate instance savings
-        instance_savings = sum(c['instance_price'] for c in current_clusters) - \
-                          sum(c['instance_price'] for c in optimal_clusters)
-
-        # Add cluster age calculation to metadata
-        metadata_dict = dict(metadata) if metadata else None
-        if metadata_dict and metadata_dict.get('creation_date'):
-            from datetime import datetime
-            try:
-                creation_date = datetime.fromisoformat(metadata_dict['creation_date'].replace('Z', '+00:00'))
-                current_date = datetime.now()
-                days_old = (current_date - creation_date).days
-                metadata_dict['age_days'] = days_old
-                if days_old >= 365:
-                    metadata_dict['age_display'] = f"{days_old / 365:.1f} years"
-                else:
-                    metadata_dict['age_display'] = f"{days_old} days"
-            except (ValueError, AttributeError):
-                metadata_dict['age_days'] = None
-                metadata_dict['age_display'] = 'N/A'
-
-        return render_template('cluster_details.html',
-                             mc_uid=mc_uid,
-                             latest_result=dict(latest_result),
-                             current_clusters=current_clusters,
-                             optimal_clusters=optimal_clusters,
-                             history=history,
-                             metadata=metadata_dict,
-                             total_current_instances=total_current_instances,
-                             total_optimal_instances=total_optimal_instances,
-                             storage_savings=storage_savings,
-                             instance_savings=instance_savings)
+                metadata_dict['age_display'] = f"{days_old} days"
+        except (ValueError, AttributeError):
+            metadata_dict['age_days'] = None
+            metadata_dict['age_display'] = 'N/A'
+
+    return render_template('cluster_details.html',
+                         mc_uid=mc_uid,
+                         latest_result=dict(latest_result),
+                         current_clusters=current_clusters,
+                         optimal_clusters=optimal_clusters,
+                         history=history,
+                         metadata=metadata_dict,
+                         total_current_instances=total_current_instances,
+                         total_optimal_instances=total_optimal_instances,
+                         storage_savings=storage_savings,
+                         instance_savings=instance_savings)
 
 
 @app.route('/top-savings')
 @handle_api_error
 def top_savings():
     """Top savings opportunities page."""
-    # Use context manager
-    with AADatabase(DB_PATH) as db:
-        # Get run_id from query param or use latest
-        run_id = request.args.get('run_id', type=int)
-
-        # Get filters from query params
-        cloud_provider_filter = request.args.get('cloud_provider', default='all', type=str)
-        software_version_filter = request.args.get('software_version', default='all', type=str)
-        top_n_param = request.args.get('top_n', default='all', type=str)
-
-        # Parse top_n parameter
-        if top_n_param == 'all':
-            top_n = 'all'
-        else:
-            top_n = int(top_n_param)
+    db = get_db()
+    # Get run_id from query param or use latest
+    run_id = request.args.get('run_id', type=int)
 
-        # Get all runs for dropdown
-        all_runs = db.conn.execute('''
-            SELECT run_id, run_timestamp, jira_ticket
-            FROM runs
-            WHERE status = 'completed'
-            ORDER BY run_timestamp DESC
-        ''').fetchall()
-
-        # Check if we have any data
-        if not all_runs:
-            return render_template('top_savings.html',
-                                 opportunities=[],
-                                 all_runs=[],
-                                 selected_run=None,
-                                 cloud_provider_filter=cloud_provider_filter,
-                                 cloud_providers=[],
-                                 software_version_filter=software_version_filter,
-                                 software_versions=[],
-                                 top_n='all')
-
-        # Get all savings (no limit)
-        opportunities = db.get_top_savings_opportunities(run_id=run_id, limit=None)
-
-        # Add cluster age calculation to each cluster
-        from datetime import datetime
-        current_date = datetime.now()
-        for cluster in opportunities:
-            if cluster.get('creation_date'):
-                try:
-                    creation_date = datetime.fromisoformat(cluster['creation_date'].replace('Z', '+00:00'))
-                    days_old = (current_date - creation_date).days
-                    cluster['age_days'] = days_old
-                    if days_old >= 365:
-                        cluster['age_display'] = f"{days_old / 365:.1f} years"
-                    else:
-                        cluster['age_display'] = f"{days_old} days"
-                except (ValueError, AttributeError):
-                    cluster['age_days'] = None
-                    cluster['age_display'] = 'N/A'
-            else:
-                cluster['age_days'] = None
-                cluster['age_display'] = 'N/A'
-
-        # Get ALL unique values (before filtering) for initial dropdown population
-        cloud_providers = sorted(list(set(
-            opp['cloud_provider'] for opp in opportunities
-            if opp.get('cloud_provider')
-        )))
-
-        software_versions = sorted(list(set(
-            opp['software_version'] for opp in opportunities
-            if opp.get('software_version')
-        )), reverse=True)
-
-        # Apply filters to opportunities
-        if cloud_provider_filter != 'all':
-            opportunities = [
-                opp for opp in opportunities
-                if opp.get('cloud_provider') == cloud_provider_filter
-            ]
-
-        if software_version_filter != 'all':
-            opportunities = [
-                opp for opp in opportunities
-                if opp.get('software_version') == software_version_filter
-            ]
-
-        # Apply top_n limit
-        if top_n != 'all':
-            opportunities = opportunities[:top_n]
-
-        # Calculate optimizable clusters count (positive savings only)
-        optimizable_count = len([opp for opp in opportunities if opp.get('savings', 0) > 0])
-
-        # Get selected run info
-        if run_id:
-            selected_run = db.conn.execute('''
-                SELECT * FROM runs WHERE run_id = ?
-            ''', (run_id,)).fetchone()
-        else:
-            selected_run = all_runs[0] if all_runs else None
+    # Get filters from query params
+    cloud_provider_filter = request.args.get('cloud_provider', default='all', type=str)
+    software_version_filter = request.args.get('software_version', default='all', type=str)
+    top_n_param = request.args.get('top_n', default='all', type=str)
+
+    # Parse top_n parameter; it becomes the SQL LIMIT, where a negative value means no limit
+    if top_n_param == 'all':
+        top_n = 'all'
+    else:
+        try:
+            top_n = int(top_n_param)
+        except ValueError:
+            top_n = 0
+        if top_n < 1:
+            logger.warning(f"Invalid top_n: {top_n_param}")
+            return "Invalid top_n, expected a positive integer or 'all'", 400
+
+    # Get all runs for dropdown
+    all_runs = db.conn.execute('''
+        SELECT run_id, run_timestamp, jira_ticket
+        FROM runs
+        WHERE status = 'completed'
+        ORDER BY run_timestamp DESC
+    ''').fetchall()
 
+    # Check if we have any data
+    if not all_runs:
         return render_template('top_savings.html',
-                             opportunities=opportunities,
-                             optimizable_count=optimizable_count,
-                             all_runs=[dict(r) for r in all_runs],
-                             selected_run=dict(selected_run) if selected_run else None,
+                             opportunities=[],
+                             all_runs=[],
+                             selected_run=None,
                              cloud_provider_filter=cloud_provider_filter,
-                             cloud_providers=cloud_providers,
+                             cloud_providers=[],
                              software_version_filter=software_version_filter,
-                             software_versions=software_versions,
-                             top_n=top_n)
-
-
-# ============================================================================
-# HELPER FUNCTIONS FOR CHARTS
-# ============================================================================
+                             software_versions=[],
+                             top_n='all')
 
-def detect_cloud_provider(instance_types):
-    """
-    Detect cloud provider from instance type names.
+    # Filters and top_n are applied in SQL
+    opportunities = db.get_top_savings_opportunities(
+        run_id=run_id,
+        limit=None if top_n == 'all' else top_n,
+        cloud_provider=None if cloud_provider_filter == 'all' else cloud_provider_filter,
+        software_version=None if software_version_filter == 'all' else software_version_filter)
 
-    Args:
-        instance_types: List of instance type names
+    # Get ALL unique values (before filtering) for initial dropdown population
+    cloud_providers, software_versions = db.get_top_savings_filter_options(run_id)
 
-    Returns:
-        str: 'AWS', 'GCP', 'Azure', or 'Unknown'
-    """
-    if not instance_types:
-        return 'Unknown'
+    # Calculate optimizable clusters count (positive savings only)
+    optimizable_count = len([opp for opp in opportunities if opp.get('savings', 0) > 0])
 
-    for instance_type in instance_types:
-        # AWS pattern: m5.large, r6i.xlarge, c5.2xlarge
-        if '.' in instance_type and any(instance_type.startswith(prefix)
-                                       for prefix in ['m', 'r', 'c', 't', 'i', 'x', 'z', 'p', 'g', 'd']):
-            return 'AWS'
-        # GCP pattern: n1-standard-4, n2-highmem-8, c3-highcpu-4
-        elif '-' in instance_type and any(instance_type.startswith(prefix)
-                                         for prefix in ['n1', 'n2', 'c2', 'c3', 'e2', 'm1', 'm2']):
-            return 'GCP'
-        # Azure pattern: Standard_D4s_v3
-        elif instance_type.startswith('Standard_'):
-            return 'Azure'
+    # Get selected run info
+    if run_id:
+        selected_run = db.conn.execute('''
+            SELECT * FROM runs WHERE run_id = ?
+        ''', (run_id,)).fetchone()
+    else:
+        selected_run = all_runs[0] if all_runs else None
 
-    return 'Unknown'
+    return render_template('top_savings.html',
+                         opportunities=opportunities,
+                         optimizable_count=optimizable_count,
+                         all_runs=[dict(r) for r in all_runs],
+                         selected_run=dict(selected_run) if selected_run else None,
+                         cloud_provider_filter=cloud_provider_filter,
+                         cloud_providers=cloud_providers,
+                         software_version_filter=software_version_filter,
+                         software_versions=software_versions,
+                         top_n=top_n)
 
 
 # ============================================================================
@@ -793,26 +708,26 @@ def detect_cloud_provider(instance_types):
 @handle_api_error
 def charts():
     """Charts and analytics page."""
-    with AADatabase(DB_PATH) as db:
-        # Get all runs for dropdown
-        all_runs = db.conn.execute('''
-            SELECT run_id, run_timestamp, jira_ticket
-            FROM runs
-            WHERE status = 'completed'
-            ORDER BY run_timestamp DESC
-        ''').fetchall()
+    db = get_db()
+    # Get all runs for dropdown
+    all_runs = db.conn.execute('''
+        SELECT run_id, run_timestamp, jira_ticket
+        FROM runs
+        WHERE status = 'completed'
+        ORDER BY run_timestamp DESC
+    ''').fetchall()
 
-        # Get latest run
-        latest_run = db.conn.execute('''
-            SELECT * FROM runs
-            WHERE status = 'completed'
-            ORDER BY run_timestamp DESC
-            LIMIT 1
-        ''').fetchone()
+    # Get latest run
+    latest_run = db.conn.execute('''
+        SELECT * FROM runs
+        WHERE status = 'completed'
+        ORDER BY run_timestamp DESC
+        LIMIT 1
+    ''').fetchone()
 
-        return render_template('charts.html',
-                             all_runs=[dict(r) for r in all_runs] if all_runs else [],
-                             latest_run=dict(latest_run) if latest_run else None)
+    return render_template('charts.html',
+                         all_runs=[dict(r) for r in all_runs] if all_runs else [],
+                         latest_run=dict(latest_run) if latest_run else None)
 
 
 # ============================================================================
@@ -820,6 +735,7 @@ def charts():
 # ============================================================================
 
 @app.route('/api/metadata/filters')
+@cached_api
 @handle_api_error
 def api_metadata_filters():
     """API: Get available filter values for metadata fields."""
@@ -829,54 +745,54 @@ def api_metadata_filters():
     if run_id and not validate_run_id(run_id):
         return jsonify({'error': 'Invalid run_id'}), 400
 
-    # Use context manager
-    with AADatabase(DB_PATH) as db:
-        # Get unique values for each metadata field
-        cursor = db.conn.cursor()
-
-        # Regions
-        regions = cursor.execute('''
-            SELECT DISTINCT cm.region
-            FROM cluster_metadata cm
-            JOIN cluster_results cr ON cm.mc_uid = cr.mc_uid
-            WHERE cr.run_id = ? AND cm.region IS NOT NULL AND cm.region != ''
-            ORDER BY cm.region
-        ''', (run_id,)).fetchall()
-
-        # Redis versions
-        redis_versions = cursor.execute('''
-            SELECT DISTINCT cm.redis_version
-            FROM cluster_metadata cm
-            JOIN cluster_results cr ON cm.mc_uid = cr.mc_uid
-            WHERE cr.run_id = ? AND cm.redis_version IS NOT NULL AND cm.redis_version != ''
-            ORDER BY cm.redis_version
-        ''', (run_id,)).fetchall()
-
-        # Storage types (can be comma-separated, so we need to split)
-        storage_types_raw = cursor.execute('''
-            SELECT DISTINCT cm.storage_type
-            FROM cluster_metadata cm
-            JOIN cluster_results cr ON cm.mc_uid = cr.mc_uid
-            WHERE cr.run_id = ? AND cm.storage_type IS NOT NULL AND cm.storage_type != ''
-        ''', (run_id,)).fetchall()
-
-        # Split comma-separated storage types
-        storage_types = set()
-        for row in storage_types_raw:
-            if row[0]:
-                for st in row[0].split(','):
-                    storage_types.add(st.strip())
-
-        result = {
-            'regions': [r[0] for r in regions],
-            'redis_versions': [v[0] for v in redis_versions],
-            'storage_types': sorted(list(storage_types))
-        }
+    db = get_db()
+    # Get unique values for each metadata field
+    cursor = db.conn.cursor()
+
+    # Regions
+    regions = cursor.execute('''
+        SELECT DISTINCT cm.region
+        FROM cluster_metadata cm
+        JOIN cluster_results cr ON cm.mc_uid = cr.mc_uid
+        WHERE cr.run_id = ? AND cm.region IS NOT NULL AND cm.region != ''
+        ORDER BY cm.region
+    ''', (run_id,)).fetchall()
+
+    # Redis versions
+    redis_versions = cursor.execute('''
+        SELECT DISTINCT cm.redis_version
+        FROM cluster_metadata cm
+        JOIN cluster_results cr ON cm.mc_uid = cr.mc_uid
+        WHERE cr.run_id = ? AND cm.redis_version IS NOT NULL AND cm.redis_version != ''
+        ORDER BY cm.redis_version
+    ''', (run_id,)).fetchall()
+
+    # Storage types (can be comma-separated, so we need to split)
+    storage_types_raw = cursor.execute('''
+        SELECT DISTINCT cm.storage_type
+        FROM cluster_metadata cm
+        JOIN cluster_results cr ON cm.mc_uid = cr.mc_uid
+        WHERE cr.run_id = ? AND cm.storage_type IS NOT NULL AND cm.storage_type != ''
+    ''', (run_id,)).fetchall()
+
+    # Split comma-separated storage types
+    storage_types = set()
+    for row in storage_types_raw:
+        if row[0]:
+            for st in row[0].split(','):
+                storage_types.add(st.strip())
+
+    result = {
+        'regions': [r[0] for r in regions],
+        'redis_versions': [v[0] for v in redis_versions],
+        'storage_types': sorted(list(storage_types))
+    }
 
-        return jsonify(result)
+    return jsonify(result)
 
 
 @app.route('/api/dynamic-filters')
+@cached_api
 @handle_api_error
 def api_dynamic_filters():
     """API: Get dynamically filtered options based on current selections."""
@@ -894,61 +810,59 @@ def api_dynamic_filters():
             'redis_versions': []
         })
 
-    # Use context manager
-    with AADatabase(DB_PATH) as db:
-        cursor = db.conn.cursor()
+    db = get_db()
+    cursor = db.conn.cursor()
 
-        # Build WHERE clause based on current filters
-        where_conditions = ['cr.run_id = ?']
-        params = [run_id]
+    # Build WHERE clause based on current filters
+    where_conditions = ['cr.run_id = ?']
+    params = [run_id]
 
-        if cloud_provider != 'all':
-            where_conditions.append('cm.cloud_provider = ?')
-            params.append(cloud_provider)
+    if cloud_provider != 'all':
+        where_conditions.append('cm.cloud_provider = ?')
+        params.append(cloud_provider)
 
-        if software_version != 'all':
-            where_conditions.append('COALESCE(cm.software_version, cm.redis_version) = ?')
-            params.append(software_version)
+    if software_version != 'all':
+        where_conditions.append('COALESCE(cm.software_version, cm.redis_version) = ?')
+        params.append(software_version)
 
-        where_clause = ' AND '.join(where_conditions)
+    where_clause = ' AND '.join(where_conditions)
 
-        # Remove f-string SQL injection risk
-        # Build query with proper parameterization
-        base_query_providers = '''
-            SELECT DISTINCT cm.cloud_provider
-            FROM cluster_metadata cm
-            JOIN cluster_results cr ON cm.mc_uid = cr.mc_uid
-            WHERE {} AND cm.cloud_provider IS NOT NULL AND cm.cloud_provider != ''
-            ORDER BY cm.cloud_provider
-        '''.format(where_clause)
+    # Remove f-string SQL injection risk
+    # Build query with proper parameterization
+    base_query_providers = '''
+        SELECT DISTINCT cm.cloud_provider
+        FROM cluster_metadata cm
+        JOIN cluster_results cr ON cm.mc_uid = cr.mc_uid
+        WHERE {} AND cm.cloud_provider IS NOT NULL AND cm.cloud_provider != ''
+        ORDER BY cm.cloud_provider
+    '''.format(where_clause)
 
-        base_query_versions = '''
-            SELECT DISTINCT COALESCE(cm.software_version, cm.redis_version) as version
-            FROM cluster_metadata cm
-            JOIN cluster_results cr ON cm.mc_uid = cr.mc_uid
-            WHERE {} AND COALESCE(cm.software_version, cm.redis_version) IS NOT NULL AND COALESCE(cm.software_version, cm.redis_version) != ''
-            ORDER BY version DESC
-        '''.format(where_clause)
+    base_query_versions = '''
+        SELECT DISTINCT COALESCE(cm.software_version, cm.redis_version) as version
+        FROM cluster_metadata cm
+        JOIN cluster_results cr ON cm.mc_uid = cr.mc_uid
+        WHERE {} AND COALESCE(cm.software_version, cm.redis_version) IS NOT NULL AND COALESCE(cm.software_version, cm.redis_version) != ''
+        ORDER BY version DESC
+    '''.format(where_clause)
 
-        # Get cloud providers
-        cloud_providers = cursor.execute(base_query_providers, params).fetchall()
+    # Get cloud providers
+    cloud_providers = cursor.execute(base_query_providers, params).fetchall()
 
-        # Get Software versions
-        software_versions = cursor.execute(base_query_versions, params).fetchall()
+    # Get Software versions
+    software_versions = cursor.execute(base_query_versions, params).fetchall()
 
-        result = {
-            'cloud_providers': [cp[0] for cp in cloud_providers],
-            'software_versions': [sv[0] for sv in software_versions]
-        }
+    result = {
+        'cloud_providers': [cp[0] for cp in cloud_providers],
+        'software_versions': [sv[0] for sv in software_versions]
+    }
 
-        return jsonify(result)
+    return jsonify(result)
 
 
 @app.route('/api/charts/savings-distribution')
 def api_savings_distribution():
     """API: Get savings distribution data for histogram."""
-    import json
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     # Get parameters
     run_id = request.args.get('run_id', type=int)
@@ -962,7 +876,6 @@ def api_savings_distribution():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'labels': [], 'data': []})
 
     # Define savings ranges
@@ -975,66 +888,49 @@ def api_savings_distribution():
         (10000, float('inf'), '$10K+')
     ]
 
-    labels = []
-    data = []
-
-    for min_val, max_val, label in ranges:
-        # Build query with metadata filters
-        query = '''
-            SELECT cr.mc_uid, cs.infra_json, cm.cloud_provider, cm.region,
-                   COALESCE(cm.software_version, cm.redis_version) as software_version, cm.storage_type
-            FROM cluster_results cr
-            JOIN cluster_singles cs ON cr.result_id = cs.result_id AND cs.cluster_type = 'current'
-            LEFT JOIN cluster_metadata cm ON cr.mc_uid = cm.mc_uid
-            WHERE cr.run_id = ? AND cr.status = 'success'
-            AND cr.total_savings >= ?
-            AND cr.savings_percent >= ?
-        '''
-        params = [run_id, min_savings, min_percent]
-
-        # Add savings range filter
-        if max_val == float('inf'):
-            query += ' AND cr.total_savings >= ?'
-            params.append(min_val)
-        else:
-            query += ' AND cr.total_savings >= ? AND cr.total_savings < ?'
-            params.extend([min_val, max_val])
-
-        # Add metadata filters
-        if software_version != 'All':
-            query += ' AND COALESCE(cm.software_version, cm.redis_version) = ?'
-            params.append(software_version)
-
-        results = db.conn.execute(query, params).fetchall()
-
-        # Filter by cloud provider (from metadata or instance types)
-        count = 0
-        if cloud_provider == 'All':
-            count = len(results)
-        else:
-            for row in results:
-                # Try metadata first
-                provider = row['cloud_provider'] if row['cloud_provider'] else None
+    # One pass over the run: each cluster is assigned its range index in SQL
+    # (negative savings fall in no range)
+    query = '''
+        SELECT CASE
+                   WHEN cr.total_savings < 500 THEN 0
+                   WHEN cr.total_savings < 1000 THEN 1
+                   WHEN cr.total_savings < 2000 THEN 2
+                   WHEN cr.total_savings < 5000 THEN 3
+                   WHEN cr.total_savings < 10000 THEN 4
+                   ELSE 5
+               END AS bucket
+        FROM cluster_results cr
+        JOIN cluster_singles cs ON cr.result_id = cs.result_id AND cs.cluster_type = 'current'
+        LEFT JOIN cluster_metadata cm ON cr.mc_uid = cm.mc_uid
+        WHERE cr.run_id = ? AND cr.status = 'success'
+        AND cr.total_savings >= ?
+        AND cr.savings_percent >= ?
+        AND cr.total_savings >= 0
+    '''
+    params = [run_id, min_savings, min_percent]
 
-                # Fallback to instance type detection
-                if not provider:
-                    infra = json.loads(row['infra_json'])
-                    provider = detect_cloud_provider(list(infra.keys()))
+    # Add metadata filters
+    if software_version != 'All':
+        query += ' AND COALESCE(cm.software_version, cm.redis_version) = ?'
+        params.append(software_version)
 
-                if provider == cloud_provider:
-                    count += 1
+    # Cloud provider from metadata, else as detected from instance types at ingest
+    if cloud_provider != 'All':
+        query += " AND COALESCE(NULLIF(cm.cloud_provider, ''), cs.instance_provider) = ?"
+        params.append(cloud_provider)
 
-        labels.append(label)
-        data.append(count)
+    counts = [0] * len(ranges)
+    for row in db.conn.execute(f'SELECT bucket, COUNT(*) AS clusters FROM ({query}) GROUP BY bucket', params):
+        counts[row['bucket']] = row['clusters']
 
-    db.close()
-    return jsonify({'labels': labels, 'data': data})
+    return jsonify({'labels': [label for _, _, label in ranges], 'data': counts})
 
 
 @app.route('/api/charts/savings-breakdown')
+@cached_api
 def api_savings_breakdown():
     """API: Get instance vs storage savings breakdown for pie chart."""
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
     if not run_id:
@@ -1042,7 +938,6 @@ def api_savings_breakdown():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'labels': [], 'data': []})
 
     # Calculate instance and storage savings (only positive savings)
@@ -1060,7 +955,6 @@ def api_savings_breakdown():
     instance_savings = max(0, result['instance_savings'] or 0)
     storage_savings = max(0, result['storage_savings'] or 0)
 
-    db.close()
     return jsonify({
         'labels': ['Instance Optimization', 'Storage Optimization'],
         'data': [round(instance_savings, 2), round(storage_savings, 2)]
@@ -1068,9 +962,10 @@ def api_savings_breakdown():
 
 
 @app.route('/api/charts/savings-trend')
+@cached_api
 def api_savings_trend():
     """API: Get savings trend over time for line chart."""
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     limit = request.args.get('limit', default=10, type=int)
 
@@ -1082,7 +977,6 @@ def api_savings_trend():
     data_rcp = [round(t['total_savings'], 2) for t in trend]  # Original RCP values
     tickets = [t['jira_ticket'] for t in trend]
 
-    db.close()
     return jsonify({
         'labels': labels,
         'data': data,
@@ -1092,9 +986,10 @@ def api_savings_trend():
 
 
 @app.route('/api/charts/current-vs-optimal')
+@cached_api
 def api_current_vs_optimal():
     """API: Get current vs optimal comparison data."""
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
     limit = request.args.get('limit', default=10, type=int)
@@ -1104,7 +999,6 @@ def api_current_vs_optimal():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'labels': [], 'current': [], 'optimal': []})
 
     # Get top clusters
@@ -1128,7 +1022,6 @@ def api_current_vs_optimal():
     current_rcp = [round(r['current_price'], 2) for r in results]  # Original RCP values
     optimal_rcp = [round(r['optimal_price'], 2) for r in results]  # Original RCP values
 
-    db.close()
     return jsonify({
         'labels': labels,
         'current': current,
@@ -1141,8 +1034,7 @@ def api_current_vs_optimal():
 @app.route('/api/charts/top-clusters')
 def api_top_clusters():
     """API: Get top clusters data with filters."""
-    import json
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
     limit = request.args.get('limit', default=10, type=int)
@@ -1156,7 +1048,6 @@ def api_top_clusters():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'labels': [], 'data': []})
 
     # Build query with metadata filters
@@ -1165,7 +1056,6 @@ def api_top_clusters():
             cr.mc_uid,
             cr.total_savings,
             cr.savings_percent,
-            cs.infra_json,
             cm.cloud_provider,
             cm.region,
             COALESCE(cm.software_version, cm.redis_version) as software_version,
@@ -1185,35 +1075,21 @@ def api_top_clusters():
         query += ' AND COALESCE(cm.software_version, cm.redis_version) = ?'
         params.append(software_version)
 
-    query += ' ORDER BY cr.total_savings DESC'
-
-    results = db.conn.execute(query, params).fetchall()
-
-    # Filter by cloud provider
-    filtered_results = []
-    for row in results:
-        if cloud_provider == 'All':
-            filtered_results.append(row)
-        else:
-            # Try metadata first
-            provider = row['cloud_provider'] if row['cloud_provider'] else None
-
-            # Fallback to instance type detection
-            if not provider:
-                infra = json.loads(row['infra_json'])
-                provider = detect_cloud_provider(list(infra.keys()))
+    # Cloud provider from metadata, else as detected from instance types at ingest
+    if cloud_provider != 'All':
+        query += " AND COALESCE(NULLIF(cm.cloud_provider, ''), cs.instance_provider) = ?"
+        params.append(cloud_provider)
 
-            if provider == cloud_provider:
-                filtered_results.append(row)
+    # At least one row, as the former fetch-then-trim loop returned
+    query += ' ORDER BY cr.total_savings DESC LIMIT ?'
+    params.append(max(limit, 1))
 
-        if len(filtered_results) >= limit:
-            break
+    filtered_results = db.conn.execute(query, params).fetchall()
 
     labels = [r['mc_uid'][:12] + '...' for r in filtered_results]
     data = [round(r['total_savings'] * ADJUSTMENT_FACTOR, 2) for r in filtered_results]
     data_rcp = [round(r['total_savings'], 2) for r in filtered_results]  # Original RCP values
 
-    db.close()
     return jsonify({
         'labels': labels,
         'data': data,
@@ -1248,8 +1124,7 @@ def build_filter_clause(cloud_provider='All', software_version='All'):
 @app.route('/api/charts/cluster-age-distribution')
 def api_cluster_age_distribution():
     """API: Get cluster age distribution histogram data."""
-    from datetime import datetime
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
     cloud_provider = request.args.get('cloudProvider', default='All')
@@ -1260,7 +1135,6 @@ def api_cluster_age_distribution():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'age_ranges': [], 'cluster_counts': [], 'total_savings': []})
 
     # Build filter clause
@@ -1269,56 +1143,44 @@ def api_cluster_age_distribution():
     where_clause = ' AND '.join(where_clauses)
     params = [run_id] + filter_params
 
-    # Get clusters with creation dates
+    # Age buckets counted and summed in SQL; julianday() is NULL for dates it cannot parse
     query = '''
-        SELECT
-            COALESCE(cm.creation_date, cm.created_at) as creation_date,
-            cr.total_savings
-        FROM cluster_results cr
-        LEFT JOIN cluster_metadata cm ON cr.mc_uid = cm.mc_uid
-        WHERE {}
-        AND COALESCE(cm.creation_date, cm.created_at) IS NOT NULL
+        SELECT bucket, COUNT(*) AS clusters, SUM(total_savings) AS savings
+        FROM (
+            SELECT
+                CASE
+                    WHEN age_days < 180 THEN 0
+                    WHEN age_days < 365 THEN 1
+                    WHEN age_days < 730 THEN 2
+                    WHEN age_days < 1095 THEN 3
+                    ELSE 4
+                END AS bucket,
+                total_savings
+            FROM (
+                SELECT
+                    CAST(julianday('now', 'localtime') - julianday(COALESCE(cm.creation_date, cm.created_at)) AS INTEGER) AS age_days,
+                    cr.total_savings
+                FROM cluster_results cr
+                LEFT JOIN cluster_metadata cm ON cr.mc_uid = cm.mc_uid
+                WHERE {}
+                AND COALESCE(cm.creation_date, cm.created_at) IS NOT NULL
+            )
+            WHERE age_days IS NOT NULL
+        )
+        GROUP BY bucket
     '''.format(where_clause)
-    results = db.conn.execute(query, tuple(params)).fetchall()
-
-    # Calculate age and categorize
-    age_buckets = {
-        '0-6 months': {'count': 0, 'savings': 0},
-        '6-12 months': {'count': 0, 'savings': 0},
-        '1-2 years': {'count': 0, 'savings': 0},
-        '2-3 years': {'count': 0, 'savings': 0},
-        '3+ years': {'count': 0, 'savings': 0}
-    }
-
-    now = datetime.now()
-    for row in results:
-        try:
-            creation_date = datetime.fromisoformat(row['creation_date'].replace('Z', '+00:00'))
-            age_days = (now - creation_date).days
-
-            if age_days < 180:
-                bucket = '0-6 months'
-            elif age_days < 365:
-                bucket = '6-12 months'
-            elif age_days < 730:
-                bucket = '1-2 years'
-            elif age_days < 1095:
-                bucket = '2-3 years'
-            else:
-                bucket = '3+ years'
 
-            age_buckets[bucket]['count'] += 1
-            age_buckets[bucket]['savings'] += row['total_savings']
-        except (ValueError, AttributeError):
-            continue
+    age_ranges = ['0-6 months', '6-12 months', '1-2 years', '2-3 years', '3+ years']
+    cluster_counts = [0] * len(age_ranges)
+    savings = [0] * len(age_ranges)
+    for row in db.conn.execute(query, tuple(params)):
+        cluster_counts[row['bucket']] = row['clusters']
+        savings[row['bucket']] = row['savings']
 
     # Prepare response
-    age_ranges = list(age_buckets.keys())
-    cluster_counts = [age_buckets[r]['count'] for r in age_ranges]
-    total_savings = [round(age_buckets[r]['savings'] * ADJUSTMENT_FACTOR, 2) for r in age_ranges]
-    total_savings_rcp = [round(age_buckets[r]['savings'], 2) for r in age_ranges]  # Original RCP values
+    total_savings = [round(s * ADJUSTMENT_FACTOR, 2) for s in savings]
+    total_savings_rcp = [round(s, 2) for s in savings]  # Original RCP values
 
-    db.close()
     return jsonify({
         'age_ranges': age_ranges,
         'cluster_counts': cluster_counts,
@@ -1330,8 +1192,7 @@ def api_cluster_age_distribution():
 @app.route('/api/charts/age-vs-savings-correlation')
 def api_age_vs_savings_correlation():
     """API: Get age vs savings correlation scatter plot data."""
-    from datetime import datetime
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
     cloud_provider = request.args.get('cloudProvider', default='All')
@@ -1342,7 +1203,6 @@ def api_age_vs_savings_correlation():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'data': []})
 
     # Build filter clause
@@ -1365,13 +1225,13 @@ def api_age_vs_savings_correlation():
         WHERE {}
         AND COALESCE(cm.creation_date, cm.created_at) IS NOT NULL
     '''.format(where_clause)
-    results = db.conn.execute(query, tuple(params)).fetchall()
 
-    # Calculate age for each cluster
+    # Calculate age for each cluster, streaming rows off the cursor
+    # rather than holding the whole result set alongside scatter_data
     scatter_data = []
     now = datetime.now()
 
-    for row in results:
+    for row in db.conn.execute(query, tuple(params)):
         try:
             creation_date = datetime.fromisoformat(row['creation_date'].replace('Z', '+00:00'))
             age_days = (now - creation_date).days
@@ -1387,68 +1247,73 @@ def api_age_vs_savings_correlation():
         except (ValueError, AttributeError):
             continue
 
-    db.close()
     return jsonify({'data': scatter_data})
 
 
 @app.route('/api/charts/multi-run-comparison')
+@cached_api
 def api_multi_run_comparison():
     """API: Get multi-run comparison data for line chart."""
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     limit = request.args.get('limit', default=10, type=int)
 
-    # Get last N runs
+    # Last N runs with their aggregates (only positive savings), in one query.
+    # Savings are summed apart from the singles join, which repeats each result
     runs = db.conn.execute('''
-        SELECT
-            run_id,
-            run_timestamp,
-            jira_ticket,
-            total_clusters,
-            processed_clusters
-        FROM runs
-        WHERE status = 'completed'
-        ORDER BY run_timestamp DESC
-        LIMIT ?
+        WITH recent AS MATERIALIZED (
+            SELECT run_id, run_timestamp
+            FROM runs
+            WHERE status = 'completed'
+            ORDER BY run_timestamp DESC
+            LIMIT ?
+        ),
+        costs AS (
+            SELECT
+                cr.run_id,
+                SUM(cs_current.total_price) as total_current,
+                SUM(cs_optimal.total_price) as total_optimal,
+                COUNT(DISTINCT cr.result_id) as cluster_count
+            FROM recent
+            JOIN cluster_results cr ON cr.run_id = recent.run_id
+            LEFT JOIN cluster_singles cs_current ON cr.result_id = cs_current.result_id AND cs_current.cluster_type = 'current'
+            LEFT JOIN cluster_singles cs_optimal ON cr.result_id = cs_optimal.result_id AND cs_optimal.cluster_type = 'optimal'
+            WHERE cr.status = 'success' AND cr.total_savings > 0
+            GROUP BY cr.run_id
+        ),
+        savings AS (
+            SELECT cr.run_id, SUM(cr.total_savings) as total_savings
+            FROM recent
+            JOIN cluster_results cr ON cr.run_id = recent.run_id
+            WHERE cr.status = 'success' AND cr.total_savings > 0
+            GROUP BY cr.run_id
+        )
+        SELECT recent.run_id, recent.run_timestamp,
+               costs.total_current, costs.total_optimal, costs.cluster_count, savings.total_savings
+        FROM recent
+        LEFT JOIN costs ON costs.run_id = recent.run_id
+        LEFT JOIN savings ON savings.run_id = recent.run_id
+        ORDER BY recent.run_timestamp DESC
     ''', (limit,)).fetchall()
 
     if not runs:
-        db.close()
         return jsonify({'labels': [], 'current_cost': [], 'optimal_cost': [], 'savings': [], 'avg_savings': []})
 
-    # Reverse to show oldest first
-    runs = list(reversed(runs))
-
     labels = []
     current_cost_data = []
     optimal_cost_data = []
     savings_data = []
     avg_savings_data = []
 
-    for run in runs:
-        # Get aggregated data for this run (only positive savings)
-        # Note: Use subquery for total_savings to avoid duplication from JOINs
-        stats = db.conn.execute('''
-            SELECT
-                SUM(cs_current.total_price) as total_current,
-                SUM(cs_optimal.total_price) as total_optimal,
-                (SELECT SUM(total_savings) FROM cluster_results
-                 WHERE run_id = ? AND status = 'success' AND total_savings > 0) as total_savings,
-                COUNT(DISTINCT cr.result_id) as cluster_count
-            FROM cluster_results cr
-            LEFT JOIN cluster_singles cs_current ON cr.result_id = cs_current.result_id AND cs_current.cluster_type = 'current'
-            LEFT JOIN cluster_singles cs_optimal ON cr.result_id = cs_optimal.result_id AND cs_optimal.cluster_type = 'optimal'
-            WHERE cr.run_id = ? AND cr.status = 'success' AND cr.total_savings > 0
-        ''', (run['run_id'], run['run_id'])).fetchone()
-
-        if stats and stats['total_current']:
-            labels.append(f"Run #{run['run_id']}\n{run['run_timestamp'][:10]}")
+    # Reverse to show oldest first
+    for stats in reversed(runs):
+        if stats['total_current']:
+            labels.append(f"Run #{stats['run_id']}\n{stats['run_timestamp'][:10]}")
             current_cost_data.append(round(stats['total_current'] * ADJUSTMENT_FACTOR, 2))
             optimal_cost_data.append(round(stats['total_optimal'] * ADJUSTMENT_FACTOR, 2))
             savings_data.append(round(stats['total_savings'] * ADJUSTMENT_FACTOR, 2))
             avg_savings_data.append(round((stats['total_savings'] / stats['cluster_count']) * ADJUSTMENT_FACTOR, 2) if stats['cluster_count'] > 0 else 0)
 
-    db.close()
     return jsonify({
         'labels': labels,
         'current_cost': current_cost_data,
@@ -1459,25 +1324,30 @@ def api_multi_run_comparison():
 
 
 @app.route('/api/charts/savings-velocity')
+@cached_api
 def api_savings_velocity():
     """API: Get savings velocity (change between runs) for area chart."""
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     limit = request.args.get('limit', default=10, type=int)
 
-    # Get last N runs
+    # Last N runs with their total savings (only positive savings), in one query
     runs = db.conn.execute('''
-        SELECT
-            run_id,
-            run_timestamp
-        FROM runs
-        WHERE status = 'completed'
-        ORDER BY run_timestamp DESC
-        LIMIT ?
+        SELECT r.run_id, r.run_timestamp, SUM(cr.total_savings) as total_savings
+        FROM (
+            SELECT run_id, run_timestamp
+            FROM runs
+            WHERE status = 'completed'
+            ORDER BY run_timestamp DESC
+            LIMIT ?
+        ) r
+        LEFT JOIN cluster_results cr
+            ON cr.run_id = r.run_id AND cr.status = 'success' AND cr.total_savings > 0
+        GROUP BY r.run_id
+        ORDER BY r.run_timestamp DESC
     ''', (limit,)).fetchall()
 
     if len(runs) < 2:
-        db.close()
         return jsonify({'labels': [], 'velocity': [], 'colors': []})
 
     # Reverse to show oldest first
@@ -1490,14 +1360,7 @@ def api_savings_velocity():
     previous_savings = None
 
     for run in runs:
-        # Get total savings for this run (only positive savings)
-        stats = db.conn.execute('''
-            SELECT SUM(cr.total_savings) as total_savings
-            FROM cluster_results cr
-            WHERE cr.run_id = ? AND cr.status = 'success' AND cr.total_savings > 0
-        ''', (run['run_id'],)).fetchone()
-
-        current_savings = stats['total_savings'] if stats and stats['total_savings'] else 0
+        current_savings = run['total_savings'] or 0
 
         if previous_savings is not None:
             delta = current_savings - previous_savings
@@ -1507,7 +1370,6 @@ def api_savings_velocity():
 
         previous_savings = current_savings
 
-    db.close()
     return jsonify({
         'labels': labels,
         'velocity': velocity_data,
@@ -1520,9 +1382,10 @@ def api_savings_velocity():
 # ============================================================================
 
 @app.route('/api/charts/cloud-provider-comparison')
+@cached_api
 def api_cloud_provider_comparison():
     """API: Get cloud provider comparison data for stacked bar chart."""
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
     cloud_provider = request.args.get('cloudProvider', default='All')
@@ -1533,7 +1396,6 @@ def api_cloud_provider_comparison():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'providers': [], 'current_instance': [], 'current_storage': [], 'optimal_instance': [], 'optimal_storage': []})
 
     # Build filter clause
@@ -1575,7 +1437,6 @@ def api_cloud_provider_comparison():
         optimal_instance.append(round(row['optimal_instance'] * ADJUSTMENT_FACTOR, 2))
         optimal_storage.append(round(row['optimal_storage'] * ADJUSTMENT_FACTOR, 2))
 
-    db.close()
     return jsonify({
         'providers': providers,
         'current_instance': current_instance,
@@ -1592,8 +1453,7 @@ def api_cloud_provider_comparison():
 @app.route('/api/charts/instance-efficiency-matrix')
 def api_instance_efficiency_matrix():
     """API: Get instance type efficiency matrix data for scatter plot."""
-    import json
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
     cloud_provider = request.args.get('cloudProvider', default='All')
@@ -1604,7 +1464,6 @@ def api_instance_efficiency_matrix():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'data': []})
 
     # Build filter clause
@@ -1633,7 +1492,7 @@ def api_instance_efficiency_matrix():
     instance_stats = {}
 
     for row in results:
-        infra = json.loads(row['infra_json'])
+        infra = json_loads(row['infra_json'])
         # Get primary instance type (most common)
         if infra:
             primary_instance = max(infra.items(), key=lambda x: x[1])[0]
@@ -1665,7 +1524,6 @@ def api_instance_efficiency_matrix():
             'provider': stats['provider']
         })
 
-    db.close()
     return jsonify({'data': scatter_data})
 
 
@@ -1676,7 +1534,7 @@ def api_instance_efficiency_matrix():
 @app.route('/api/charts/storage-type-distribution')
 def api_storage_type_distribution():
     """API: Get storage type distribution and savings."""
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
     cloud_provider = request.args.get('cloudProvider', default='All')
@@ -1687,7 +1545,6 @@ def api_storage_type_distribution():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'storage_types': [], 'cluster_counts': [], 'avg_savings': []})
 
     # Build filter clause
@@ -1721,7 +1578,6 @@ def api_storage_type_distribution():
         cluster_counts.append(row['cluster_count'])
         avg_savings.append(round(row['avg_savings'], 2))
 
-    db.close()
     return jsonify({
         'storage_types': storage_types,
         'cluster_counts': cluster_counts,
@@ -1732,7 +1588,7 @@ def api_storage_type_distribution():
 @app.route('/api/charts/instance-storage-breakdown')
 def api_instance_storage_breakdown():
     """API: Get instance vs storage savings breakdown per cluster."""
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
     limit = request.args.get('limit', default=20, type=int)
@@ -1742,7 +1598,6 @@ def api_instance_storage_breakdown():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'labels': [], 'instance_savings': [], 'storage_savings': []})
 
     # Get top clusters by total savings
@@ -1769,7 +1624,6 @@ def api_instance_storage_breakdown():
         instance_savings.append(round(row['instance_savings'], 2))
         storage_savings.append(round(row['storage_savings'], 2))
 
-    db.close()
     return jsonify({
         'labels': labels,
         'instance_savings': instance_savings,
@@ -1784,7 +1638,7 @@ def api_instance_storage_breakdown():
 @app.route('/api/charts/software-version-analysis')
 def api_software_version_analysis():
     """API: Get Software version adoption and cost analysis."""
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
 
@@ -1793,7 +1647,6 @@ def api_software_version_analysis():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'versions': [], 'cluster_counts': [], 'avg_cost': [], 'avg_savings_percent': []})
 
     # Get data grouped by Software version
@@ -1823,7 +1676,6 @@ def api_software_version_analysis():
         avg_cost.append(round(row['avg_cost'], 2))
         avg_savings_percent.append(round(row['avg_savings_percent'], 2))
 
-    db.close()
     return jsonify({
         'versions': versions,
         'cluster_counts': cluster_counts,
@@ -1835,8 +1687,7 @@ def api_software_version_analysis():
 @app.route('/api/charts/software-version-age-analysis')
 def api_software_version_age_analysis():
     """API: Get software version age analysis bubble chart data."""
-    from datetime import datetime
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
     cloud_provider = request.args.get('cloudProvider', default='All')
@@ -1847,7 +1698,6 @@ def api_software_version_age_analysis():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'data': []})
 
     # Build filter clause
@@ -1896,7 +1746,6 @@ def api_software_version_age_analysis():
         except (ValueError, AttributeError):
             continue
 
-    db.close()
     return jsonify({'data': bubble_data})
 
 
@@ -1907,7 +1756,7 @@ def api_software_version_age_analysis():
 @app.route('/api/charts/cluster-size-correlation')
 def api_cluster_size_correlation():
     """API: Get cluster size vs savings correlation data."""
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
 
@@ -1916,7 +1765,6 @@ def api_cluster_size_correlation():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'data': []})
 
     # Get all clusters
@@ -1941,14 +1789,13 @@ def api_cluster_size_correlation():
             'provider': row['cloud_provider'] or 'Unknown'
         })
 
-    db.close()
     return jsonify({'data': scatter_data})
 
 
 @app.route('/api/charts/shards-count-distribution')
 def api_shards_count_distribution():
     """API: Get shards count distribution histogram data."""
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
     cloud_provider = request.args.get('cloudProvider', default='All')
@@ -1959,7 +1806,6 @@ def api_shards_count_distribution():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'shard_ranges': [], 'cluster_counts': [], 'avg_savings': [], 'utilization': []})
 
     # Build filter clause
@@ -2028,7 +1874,6 @@ def api_shards_count_distribution():
         for r in shard_ranges
     ]
 
-    db.close()
     return jsonify({
         'shard_ranges': shard_ranges,
         'cluster_counts': cluster_counts,
@@ -2044,8 +1889,7 @@ def api_shards_count_distribution():
 @app.route('/api/charts/current-vs-optimal-radar')
 def api_current_vs_optimal_radar():
     """API: Get current vs optimal radar chart data."""
-    import json
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
     cloud_provider = request.args.get('cloudProvider', default='All')
@@ -2056,7 +1900,6 @@ def api_current_vs_optimal_radar():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'labels': [], 'current': [], 'optimal': []})
 
     # Build filter clause
@@ -2100,12 +1943,12 @@ def api_current_vs_optimal_radar():
     # Count total instances
     current_instance_count = 0
     for row in current_instances:
-        infra = json.loads(row['infra_json'])
+        infra = json_loads(row['infra_json'])
         current_instance_count += sum(infra.values())
 
     optimal_instance_count = 0
     for row in optimal_instances:
-        infra = json.loads(row['infra_json'])
+        infra = json_loads(row['infra_json'])
         optimal_instance_count += sum(infra.values())
 
     # Normalize values for radar chart (0-100 scale)
@@ -2130,7 +1973,6 @@ def api_current_vs_optimal_radar():
         round(((stats['total_current_cost'] - stats['total_optimal_cost']) / stats['total_current_cost']) * 100, 2) if stats['total_current_cost'] > 0 else 0
     ]
 
-    db.close()
     return jsonify({
         'labels': labels,
         'current': current_data,
@@ -2145,8 +1987,7 @@ def api_current_vs_optimal_radar():
 @app.route('/api/charts/cost-treemap')
 def api_cost_treemap():
     """API: Get cost components treemap data."""
-    import json
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
 
@@ -2155,7 +1996,6 @@ def api_cost_treemap():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'data': []})
 
     # Get hierarchical data: Provider -> Region -> Instance Type
@@ -2178,7 +2018,7 @@ def api_cost_treemap():
     for row in results:
         provider = row['cloud_provider'] or 'Unknown'
         region = row['region'] or 'Unknown'
-        infra = json.loads(row['infra_json'])
+        infra = json_loads(row['infra_json'])
 
         if provider not in hierarchy:
             hierarchy[provider] = {}
@@ -2216,7 +2056,6 @@ def api_cost_treemap():
                     'count': data['count']
                 })
 
-    db.close()
     return jsonify({'data': treemap_data})
 
 
@@ -2227,8 +2066,7 @@ def api_cost_treemap():
 @app.route('/api/charts/cluster-age-savings-potential')
 def api_cluster_age_savings_potential():
     """API: Get cluster age vs savings potential scatter plot data."""
-    from datetime import datetime
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
     cloud_provider = request.args.get('cloudProvider', default='All')
@@ -2239,7 +2077,6 @@ def api_cluster_age_savings_potential():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'data': []})
 
     # Build filter clause
@@ -2280,14 +2117,13 @@ def api_cluster_age_savings_potential():
         except (ValueError, AttributeError):
             continue
 
-    db.close()
     return jsonify({'data': scatter_data})
 
 
 @app.route('/api/charts/cost-breakdown-by-component')
 def api_cost_breakdown_by_component():
     """API: Get cost breakdown by component (instance vs storage) per cloud provider."""
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
     software_version = request.args.get('softwareVersion', default='All')
@@ -2297,7 +2133,6 @@ def api_cost_breakdown_by_component():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'labels': [], 'instance_costs': [], 'storage_costs': []})
 
     # Build filter clause (no cloud_provider filter since we're grouping by it)
@@ -2337,7 +2172,6 @@ def api_cost_breakdown_by_component():
         instance_costs.append(round(row['total_instance_cost'], 2))
         storage_costs.append(round(row['total_storage_cost'], 2))
 
-    db.close()
     return jsonify({
         'labels': labels,
         'instance_costs': instance_costs,
@@ -2348,7 +2182,7 @@ def api_cost_breakdown_by_component():
 @app.route('/api/charts/optimization-rate-trend')
 def api_optimization_rate_trend():
     """API: Get optimization rate trend over time (last 10 runs)."""
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     cloud_provider = request.args.get('cloudProvider', default='All')
     software_version = request.args.get('softwareVersion', default='All')
@@ -2363,7 +2197,6 @@ def api_optimization_rate_trend():
     ''').fetchall()
 
     if not runs:
-        db.close()
         return jsonify({'labels': [], 'optimization_rate': [], 'avg_savings_percent': []})
 
     # Reverse to show oldest first
@@ -2404,7 +2237,6 @@ def api_optimization_rate_trend():
             optimization_rates.append(0)
             avg_savings_percents.append(0)
 
-    db.close()
     return jsonify({
         'labels': labels,
         'optimization_rate': optimization_rates,
@@ -2415,7 +2247,7 @@ def api_optimization_rate_trend():
 @app.route('/api/charts/regional-cost-efficiency')
 def api_regional_cost_efficiency():
     """API: Get regional cost efficiency matrix (bubble chart data)."""
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
     cloud_provider = request.args.get('cloudProvider', default='All')
@@ -2426,7 +2258,6 @@ def api_regional_cost_efficiency():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'data': []})
 
     # Build filter clause (only positive savings)
@@ -2484,14 +2315,13 @@ def api_regional_cost_efficiency():
             'backgroundColor': provider_colors.get(row['cloud_provider'], 'rgba(128, 128, 128, 0.6)')
         })
 
-    db.close()
     return jsonify({'data': bubble_data})
 
 
 @app.route('/api/charts/shards-distribution-cost')
 def api_shards_distribution_cost():
     """API: Get shards distribution vs cost (box plot data)."""
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
     cloud_provider = request.args.get('cloudProvider', default='All')
@@ -2502,7 +2332,6 @@ def api_shards_distribution_cost():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'data': []})
 
     # Build filter clause
@@ -2575,15 +2404,13 @@ def api_shards_distribution_cost():
             'count': n
         })
 
-    db.close()
     return jsonify({'data': box_plot_data})
 
 
 @app.route('/api/charts/optimization-priority')
 def api_optimization_priority():
     """API: Get top 10 clusters by optimization priority score."""
-    from datetime import datetime
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
     cloud_provider = request.args.get('cloudProvider', default='All')
@@ -2594,7 +2421,6 @@ def api_optimization_priority():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'labels': [], 'scores': [], 'colors': []})
 
     # Build filter clause
@@ -2669,7 +2495,6 @@ def api_optimization_priority():
         else:
             colors.append('rgba(40, 167, 69, 0.8)')  # Green - Low priority
 
-    db.close()
     return jsonify({
         'labels': labels,
         'scores': scores,
@@ -2684,7 +2509,7 @@ def api_optimization_priority():
 @app.route('/api/filters/cloud-providers')
 def api_filter_cloud_providers():
     """API: Get list of cloud providers for filter."""
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
 
@@ -2693,7 +2518,6 @@ def api_filter_cloud_providers():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'providers': []})
 
     # Get unique cloud providers for this run
@@ -2707,14 +2531,13 @@ def api_filter_cloud_providers():
 
     providers = [row['cloud_provider'] for row in results]
 
-    db.close()
     return jsonify({'providers': providers})
 
 
 @app.route('/api/filters/software-versions')
 def api_filter_software_versions():
     """API: Get list of Software versions for filter."""
-    db = AADatabase(DB_PATH)
+    db = get_db()
 
     run_id = request.args.get('run_id', type=int)
 
@@ -2723,7 +2546,6 @@ def api_filter_software_versions():
         run_id = latest['run_id'] if latest else None
 
     if not run_id:
-        db.close()
         return jsonify({'versions': []})
 
     # Get unique Software versions for this run (with fallback to redis_version)
@@ -2737,7 +2559,6 @@ def api_filter_software_versions():
 
     versions = [row['version'] for row in results]
 
-    db.close()
     return jsonify({'versions': versions})
 
 